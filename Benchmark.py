@@ -0,0 +1,128 @@
+# Timing of the hot paths of the model on synthetic data, saved as JSON for regression comparison
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from argparse import ArgumentParser
+import numpy as np
+import datetime as dt
+import contextlib
+import platform
+import json
+import time
+import io
+import os
+
+parser = ArgumentParser()
+parser.add_argument('-y', default=[1, 2, 5, 10], type=int, nargs='+', required=False, help='horizon lengths in years')
+parser.add_argument('-r', default=3, type=int, required=False, help='repeats per measurement, the fastest is kept')
+parser.add_argument('-o', default='Results/benchmark.json', type=str, required=False, help='JSON file of the timings')
+parser.add_argument('-c', default=None, type=str, required=False, help='JSON file of earlier timings to compare with')
+parser.add_argument('-t', default=1.2, type=float, required=False, help='ratio to the earlier timing reported as a slowdown')
+parser.add_argument('-d', default='Benchmark', type=str, required=False, help='directory of the synthetic data')
+
+def Measure(function, repeats):
+    """Fastest of repeated calls in seconds, after one call to compile and warm the caches"""
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+def Horizon(years, repeats, directory):
+    """Timings of the hot paths for synthetic data of a number of years, in seconds"""
+
+    import Synthetic
+    import Input, Cache
+    from Input import Model, Solution
+    from Simulation import Reliability
+    from Network import Transmission
+    from Fill import fill_deficit
+    import Optimisation, Dispatch, Statistics, Records
+
+    directory = Synthetic.Generate(os.path.join(directory, '{}y'.format(years)), years)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    Input.models.clear()
+    Cache.loaded.clear()
+
+    try:
+        data = Model('existing', 'Super', 2, True)
+        intervals, baseload, daily_peaking, peaking_hours = (data.intervals, data.baseload, data.daily_peaking, data.peaking_hours)
+
+        # Mid-range candidate, and a lean one that leaves deficits to be filled
+        lb = np.array(data.pv_lb + data.contingency_ph + [0.] + [0.] * data.inters)
+        ub = np.array(data.pv_ub + data.phes_ub + data.phes_s_ub + data.inters_ub)
+        x, lean = (lb + 0.5 * (ub - lb), lb + 0.05 * (ub - lb))
+
+        S = Solution(x, data)
+        imports = np.zeros(intervals)
+        Reliability(S, baseload, imports, daily_peaking, peaking_hours)
+
+        L = Solution(lean, data)
+        Deficit = Reliability(L, baseload, imports, daily_peaking, peaking_hours)[2]
+
+        timings = {
+            'Reliability': Measure(lambda: Reliability(S, baseload, imports, daily_peaking, peaking_hours), repeats),
+            'Transmission': Measure(lambda: Transmission(S, domestic_only=True, output=True), repeats),
+            'Optimisation.F': Measure(lambda: Optimisation.F(x, data), repeats),
+            'fill_deficit': Measure(lambda: fill_deficit(Deficit, np.zeros(intervals), sum(L.CInter) * 1e3, data.energy * 1e9, True, 0.8, 168), repeats),
+            'Dispatch.Flexible': Measure(lambda: Dispatch.Flexible((data.firstyear, lean, data)), repeats),
+            'Statistics.Information': Measure(lambda: Statistics.Information(x, np.full(intervals, sum(S.CInter) * 1e3), data), repeats),
+        }
+
+    finally:
+        Records.Flush() # The records of Optimisation.F belong to the synthetic Results, not to those of the working directory
+        os.chdir(cwd)
+
+    return timings
+
+def Compare(results, baseline, threshold):
+    """Print the ratio of each timing to the baseline; returns the slowdowns beyond threshold"""
+
+    slowdowns = []
+    for years, timings in results['timings'].items():
+        for name, seconds in timings.items():
+            before = baseline['timings'].get(years, {}).get(name)
+            if before is None:
+                continue
+            ratio = seconds / before
+            print('{:>3} years {:<24} {:9.4f} s {:9.4f} s {:6.2f}x'.format(years, name, before, seconds, ratio))
+            if ratio > threshold:
+                slowdowns.append((years, name, ratio))
+
+    return slowdowns
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    try:
+        import numba
+        version = numba.__version__
+    except ImportError:
+        version = None
+
+    results = {'date': dt.datetime.now().isoformat(), 'python': platform.python_version(), 'numpy': np.__version__, 'numba': version,
+               'machine': platform.machine(), 'cpus': os.cpu_count(), 'repeats': args.r, 'timings': {}}
+
+    for years in args.y:
+        results['timings'][str(years)] = Horizon(years, args.r, args.d)
+        for name, seconds in results['timings'][str(years)].items():
+            print('{:>3} years {:<24} {:9.4f} s'.format(years, name, seconds))
+
+    os.makedirs(os.path.dirname(args.o) or '.', exist_ok=True)
+    with open(args.o, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.c is not None:
+        with open(args.c) as f:
+            slowdowns = Compare(results, json.load(f), args.t)
+        for years, name, ratio in slowdowns:
+            print('Slowdown: {} over {} years is {:.2f}x slower'.format(name, years, ratio))
+        if slowdowns:
+            raise SystemExit(1)
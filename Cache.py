@@ -0,0 +1,61 @@
+# Binary cache of the parsed input data files
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+import numpy as np
+import hashlib
+import os
+
+loaded = {} # Arrays already loaded by this process, shared between scenarios
+
+def genfromtxt(fname, **kwargs):
+    """Drop-in for np.genfromtxt, memory-mapped from Data/.cache/<file>.<hash>.npy when the content and arguments are unchanged"""
+
+    status = os.stat(fname)
+    key = (os.path.abspath(fname), status.st_mtime_ns, status.st_size, repr(sorted(kwargs.items())))
+    if key not in loaded:
+        loaded[key] = load(fname, **kwargs)
+
+    return loaded[key]
+
+def load(fname, **kwargs):
+    """Cache.genfromtxt without the in-process memo"""
+
+    directory = os.path.join(os.path.dirname(fname), '.cache')
+    base = os.path.basename(fname)
+
+    # <file>.<arguments>.<content>.npy: a file parsed with different arguments has entries of its own
+    arguments = hashlib.sha1(repr(sorted((k, list(v) if isinstance(v, range) else v) for k, v in kwargs.items())).encode()).hexdigest()[:8]
+    digest = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    prefix = '{}.{}.'.format(base, arguments)
+    cache = os.path.join(directory, '{}{}.npy'.format(prefix, digest.hexdigest()[:16]))
+
+    if os.path.exists(cache):
+        try:
+            return np.load(cache, mmap_mode='r')
+        except (OSError, ValueError):
+            pass # Removed or unreadable since the check: parse the file instead
+
+    data = np.genfromtxt(fname, **kwargs)
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Remove entries of earlier versions of this file parsed with the same arguments
+        for stale in os.listdir(directory):
+            if stale.startswith(prefix) and stale.endswith('.npy') and os.path.join(directory, stale) != cache:
+                try:
+                    os.remove(os.path.join(directory, stale))
+                except FileNotFoundError:
+                    pass # Removed by another process
+        temporary = '{}.{}.tmp'.format(cache, os.getpid())
+        with open(temporary, 'wb') as f:
+            np.save(f, data)
+        os.replace(temporary, cache) # Atomic, so concurrent workers never read a partial file
+    except OSError:
+        pass
+
+    return data
@@ -0,0 +1,71 @@
+# Representative periods: the days of the horizon clustered (k-medoids) into weighted representative days for fast screening
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+import numpy as np
+
+length = 24 # Hours per period: days tile the 8760-hour years of the data, weeks do not
+
+def Features(data, hours):
+    """Features(p, f) of each period: the netload before solar, the output of each solar site and the peaking hydro, each group normalised"""
+
+    groups = []
+    for series in (data.Netbase[:, None], data.TSPV, data.daily_peaking.sum(axis=1)[:, None]):
+        scale = abs(series).max()
+        series = series / scale if scale > 0 else series
+        groups.append(series / np.sqrt(series.shape[1])) # Each group weighs the same in the distances, however many columns it has
+
+    X = np.hstack(groups) # X(t, f)
+    return X.reshape(-1, hours * X.shape[1])
+
+def Distances(X, Y):
+    """Squared Euclidean distances(i, j) between the rows of X and Y"""
+
+    return np.maximum((X * X).sum(axis=1)[:, None] + (Y * Y).sum(axis=1)[None, :] - 2 * X @ Y.transpose(), 0)
+
+def Medoids(X, k, iterations=100):
+    """medoids, labels = Cluster.Medoids(X, k): k medoid rows of X(p, f) and the cluster of each row.
+    Farthest-first initialisation, so that extreme periods become medoids, then alternating (Voronoi) iteration"""
+
+    k = min(k, len(X))
+    medoids = [int(Distances(X, X.mean(axis=0)[None, :]).argmin())]
+    nearest = Distances(X, X[medoids])[:, 0]
+    while len(medoids) < k:
+        medoids.append(int(nearest.argmax()))
+        nearest = np.minimum(nearest, Distances(X, X[medoids[-1:]])[:, 0])
+    medoids = np.array(medoids)
+
+    for i in range(iterations):
+        labels = Distances(X, X[medoids]).argmin(axis=1)
+        update = medoids.copy()
+        for c in range(k):
+            members = np.flatnonzero(labels == c)
+            if len(members):
+                update[c] = members[Distances(X[members], X[members]).sum(axis=1).argmin()]
+        if (update == medoids).all():
+            break
+        medoids = update
+
+    return medoids, Distances(X, X[medoids]).argmin(axis=1)
+
+def Reduce(data, periods):
+    """Cluster.Reduce(data, 30): replace the time series of data with its representative days in chronological order,
+    each interval weighted by the number of days it stands for (data.weights). Storage runs on from one day to the next"""
+
+    hours = int(round(length / data.resolution))
+    if data.intervals % hours:
+        raise ValueError('The horizon of {} intervals is not a whole number of days.'.format(data.intervals))
+
+    medoids, labels = Medoids(Features(data, hours), periods)
+    counts = np.bincount(labels, minlength=len(medoids))
+    order = np.argsort(medoids) # Chronological, so that the seasons follow each other
+    medoids, counts = (medoids[order], counts[order])
+
+    rows = (medoids[:, None] * hours + np.arange(hours)).ravel()
+    data.MLoad, data.TSPV, data.hydroProfiles, data.baseload, data.daily_peaking, data.Netbase = \
+        [np.ascontiguousarray(array[rows]) for array in (data.MLoad, data.TSPV, data.hydroProfiles, data.baseload, data.daily_peaking, data.Netbase)]
+    data.weights = np.repeat(counts, hours).astype(float) # Intervals of the full horizon represented by each interval
+    data.representatives, data.intervals = (medoids, len(rows))
+
+    return data
@@ -3,18 +3,21 @@
 # Licensed under the MIT Licence
 # Correspondence: bin.lu@anu.edu.au
 
-from Input import *
-from Simulation import Reliability
+from Input import Model, Solution, firstyear, finalyear
+from Simulation import Reliability, Resume
 
+import numpy as np
 import datetime as dt
 from multiprocessing import Pool, cpu_count
 
 def Flexible(instance):
     """Energy source of high flexibility"""
 
-    year, x = instance
+    year, x, data = instance
 
-    S = Solution(x)
+    resolution, baseload, daily_peaking, peaking_hours = (data.resolution, data.baseload, data.daily_peaking, data.peaking_hours)
+
+    S = Solution(x, data)
 
     #startidx = int((24 / resolution) * (dt.datetime(year, 1, 1) - dt.datetime(firstyear, 1, 1)).days)
     #endidx = int((24 / resolution) * (dt.datetime(year+1, 1, 1) - dt.datetime(firstyear, 1, 1)).days)
@@ -24,14 +27,18 @@ def Flexible(instance):
     Fcapacity = np.nan_to_num(np.array(S.CInter)).sum() * pow(10, 3) # GW to MW
     flexible = Fcapacity * np.ones(endidx - startidx)
 
+    Reliability(S, baseload=baseload, india_imports=flexible, daily_peaking=daily_peaking, peaking_hours=peaking_hours, start=startidx, end=endidx) # Sj-EDE(t, j), MW
+
+    # Each probe changes one interval, so the simulation resumes from there rather than from the start of the year
     for i in range(0, endidx - startidx):
         flexible[i] = 0
-        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePond, Spillage = Reliability(S, baseload=baseload, india_imports=flexible, daily_pondage=daily_pondage, start=startidx, end=endidx) # Sj-EDE(t, j), MW
+        Resume(S, flexible, i, i + 1)
+        # The results of the resumed simulation, as Simulation.Resume leaves them on S
+        Deficit, DischargePH, DischargePond = (S.Deficit, S.DischargePH, S.DischargePeaking)
         #print(year, i, Deficit.sum(), DischargePond.sum(), baseload.sum())
         if Deficit.sum() * resolution > 0.1:
             flexible[i] = Fcapacity - DischargePond[i] - DischargePH[i]
-
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePond, Spillage = Reliability(S, baseload=baseload, india_imports=flexible, daily_pondage=daily_pondage, start=startidx, end=endidx) # Required after updating final interval of flexible
+            Resume(S, flexible, i, i + 1) # Required before probing the next interval
 
     flexible = np.clip(flexible - S.Spillage, 0, None)
 
@@ -39,7 +46,7 @@ def Flexible(instance):
 
     return flexible
 
-def Analysis(x,suffix):
+def Analysis(x,suffix,data):
     """Dispatch.Analysis(result.x)"""
 
     starttime = dt.datetime.now()
@@ -48,7 +55,7 @@ def Analysis(x,suffix):
     # Multiprocessing
     pool = Pool(processes=min(cpu_count(), finalyear - firstyear + 1))
     #print(cpu_count(), finalyear, firstyear)
-    instances = map(lambda y: [y] + [x], range(firstyear, finalyear + 1))
+    instances = map(lambda y: [y] + [x] + [data], range(firstyear, finalyear + 1))
     Dispresult = pool.map(Flexible, instances)
     pool.terminate()
 
@@ -59,11 +66,11 @@ def Analysis(x,suffix):
     print('Dispatch took', endtime - starttime)
 
     from Statistics import Information
-    Information(x, Flex)
+    Information(x, Flex, data)
 
     return True
 
 if __name__ == '__main__':
     suffix="_Super_existing_20_True.csv"
     capacities = np.genfromtxt('Results/Optimisation_resultx'+suffix, delimiter=',')
-    Analysis(capacities,suffix)
\ No newline at end of file
+    Analysis(capacities,suffix,Model('existing', 'Super', 20, True))
\ No newline at end of file
@@ -4,42 +4,56 @@ Created on Mon Dec  7 14:17:37 2020
 @author: cheng + tim
 """
 
-from Input import *
-from Simulation import Reliability
+from Input import Model, Solution
+from Simulation import Reliability, Resume
 import numpy as np
 import datetime as dt
 
 def fill_deficit(deficit,india_imports,india_limit,india_annual,impflag,eff,step):
-    idx = np.where(deficit > 0)[0]
-    for idd, i in np.ndenumerate(idx):
+    """Back-fill each deficit with imports at the latest earlier hours below the import limit, within the annual import limit"""
+
+    # Running annual totals, and for each hour the latest hour at or before it that is below the limit (-1 if none)
+    annual = [sum(india_imports[year*8760:(year+1)*8760]) for year in range((len(india_imports) + 8759) // 8760)]
+    below = np.where(india_imports < india_limit, np.arange(len(india_imports)), -1)
+    below = np.maximum.accumulate(below).tolist() if len(below) else []
+
+    def latest(t):
+        """Latest hour at or before t below the limit, compressing the path of saturated hours"""
+        path = []
+        while t >= 0 and below[t] != t:
+            path.append(t)
+            t = below[t]
+        for p in path:
+            below[p] = t
+        return t
+
+    for i in np.where(deficit > 0)[0]:
         d = deficit[i]
         t = i
         count = 0
-        #print("--------------------")
-        #print(idd, " of ", len(idx))
-        try:
-            while d > 0 and t >= 0 and count < step:
-                #print("t = ",t)
-                year = t // 8760
-                start = year * 8760
-                end = (year+1) * 8760
-                if t == i - 1:
-                    d = d / eff
-                if impflag:
-                    remaining = india_annual - sum(india_imports[start:end])
-                    assert remaining >= 0
-                    hydro_c = min(india_imports[t] + d, india_limit, india_imports[t] + remaining)
-                    d = d - (hydro_c - india_imports[t])
-                    india_imports[t] = hydro_c
-                    if remaining == 0:
-                        print("Year", year, " annual limit met")
-                        t = start - 1
-                    else:
-                        idxx = np.where(india_imports < india_limit)[0]
-                        t = sorted([i for i in idxx if i < t])[-1]
-                count += 1
-        except:
-            continue
+        while d > 0 and t >= 0 and count < step:
+            year = t // 8760
+            start = year * 8760
+            if t == i - 1:
+                d = d / eff
+            if impflag:
+                remaining = india_annual - annual[year]
+                if remaining < 0:
+                    break
+                hydro_c = min(india_imports[t] + d, india_limit, india_imports[t] + remaining)
+                d = d - (hydro_c - india_imports[t])
+                annual[year] += hydro_c - india_imports[t]
+                india_imports[t] = hydro_c
+                if india_imports[t] >= india_limit and below[t] == t:
+                    below[t] = t - 1 # Saturated
+                if remaining == 0:
+                    print("Year", year, " annual limit met")
+                    t = start - 1
+                else:
+                    t = latest(t - 1) # Latest earlier hour below the limit
+                    if t < 0:
+                        break
+            count += 1
     return india_imports
 
 def save(imp,suffix):
@@ -48,14 +62,18 @@ def save(imp,suffix):
 def maxx(x):
     return np.reshape(x, (-1, 8760)).sum(axis=-1).max()/1e6
 
-def mean(x):
+def mean(x, years):
     return x.sum()/years/1e6
 
-def Analysis(optimisation_x,suffix):
+def Analysis(optimisation_x,suffix,data,incremental=True):
+    """Fill.Analysis(result.x, suffix, data): back-fill the deficits with imports; incremental re-simulates only from the first import changed by each pass"""
     starttime = dt.datetime.now()
     print('Deficit fill starts at', starttime)
 
-    S = Solution(optimisation_x)
+    intervals, resolution, years, allowance = (data.intervals, data.resolution, data.years, data.allowance)
+    baseload, daily_peaking, peaking_hours, efficiencyPH, energy = (data.baseload, data.daily_peaking, data.peaking_hours, data.efficiencyPH, data.energy)
+
+    S = Solution(optimisation_x, data)
     
     Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargePeaking1, Spillage1 = Reliability(S, baseload=baseload, india_imports=np.zeros(intervals), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
     Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
@@ -75,17 +93,28 @@ def Analysis(optimisation_x,suffix):
     print("------------------------------")
     india_imports = np.zeros(intervals)
     Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
-    imp = fill_deficit(Deficit,india_imports,sum(S.CInter)*1e3,Indiamax,True,0.8,168)
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=imp, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+
+    def Fill(Deficit, imp):
+        """One back-filling pass and the simulation of its imports: (Deficit, imp, number of imports changed)"""
+        previous = imp.copy()
+        imp = fill_deficit(Deficit,imp,sum(S.CInter)*1e3,Indiamax,True,0.8,168)
+        changed = np.flatnonzero(imp != previous)
+        if not incremental:
+            Deficit = Reliability(S, baseload=baseload, india_imports=imp, daily_peaking=daily_peaking, peaking_hours=peaking_hours)[2]
+        elif len(changed):
+            # Storage before the first change is unaffected, and the run stops once it rejoins the previous pass
+            Resume(S, imp, changed[0], changed[-1] + 1)
+        return S.Deficit, imp, len(changed)
+
+    Deficit, imp, changed = Fill(Deficit, india_imports)
     print("India generation:", maxx(imp))
     print("Remaining deficit:", Deficit.sum()/1e6)
     step = 1
-    while Deficit.sum() > allowance*years and step < 50:
-        imp = fill_deficit(Deficit,imp,sum(S.CInter)*1e3,Indiamax,True,0.8,168)
-        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=imp, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+    while Deficit.sum() > allowance*years and step < 50 and changed:
+        Deficit, imp, changed = Fill(Deficit, imp) # A pass that changes nothing would be repeated to the end
         step += 1
     print("India generation max:", maxx(imp))
-    print("India generation mean:", mean(imp))
+    print("India generation mean:", mean(imp, years))
     print("Remaining deficit final:", Deficit.sum()/1e6)
 
     save(imp,suffix)
@@ -94,11 +123,11 @@ def Analysis(optimisation_x,suffix):
     print('Deficit fill took', endtime - starttime)
 
     from Statistics import Information
-    Information(optimisation_x,imp)
+    Information(optimisation_x,imp,data)
 
     return True
 
 if __name__=='__main__':
     suffix = "_Super_existing_2_True.csv"
     optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
-    Analysis(optimisation_x,suffix)
\ No newline at end of file
+    Analysis(optimisation_x,suffix,Model('existing', 'Super', 2, True))
\ No newline at end of file
@@ -4,7 +4,10 @@
 # Correspondence: bin.lu@anu.edu.au
 
 import numpy as np
-from Optimisation import scenario, node, percapita, import_flag
+from functools import cached_property
+from Shared import Attach
+from Cache import genfromtxt
+import Cluster
 
 ###### NODAL LISTS ######
 
@@ -12,175 +15,227 @@ Nodel = np.array(['SP', 'KP', 'LP', 'GP', 'BP', 'MP', 'EP', 'TI','GI', 'MI', 'KI
 PVl = np.array(['SP'] * 3 + ['KP'] * 3 + ['LP'] * 2 + ['GP'] * 3 + ['BP'] * 3 + ['MP'] * 3 + ['EP'] * 6)
 pv_ub_np = np.array([22., 28., 15.] + [12., 18., 27.] + [22., 24.] + [25., 22., 20. ] + [18., 30., 14.] + [12., 19., 10.] + [17., 18., 14., 11., 10., 12.])
 phes_ub_np = np.array([50.] + [100.] + [50.] + [50.] + [50.] + [20.] + [100.] + [0.] + [0.] + [0.] + [0.])
+hydrol = np.array(['SP']*1+['KP']*1+['LP']*1+['GP']*1+['BP']*1+['MP']*1+['EP']*1)
 
-# Add external interconnections 
-Interl = np.array(['TI']*1 + ['GI']*1 + ['MI']*1 + ['KI']*1) if node == 'Super' else np.array([])
 resolution = 1
 
-###### DATA IMPORTS ######
-MLoad = np.genfromtxt('Data/electricity{}.csv'.format(percapita), delimiter=',', skip_header=1, usecols=range(4, 4+len(Nodel))) # EOLoad(t, j), MW
-TSPV = np.genfromtxt('Data/pv.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(PVl))) # TSPV(t, i), MW
-
-assets = np.genfromtxt('Data/assets_{}.csv'.format(scenario), dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(float)
-constraints = np.genfromtxt('Data/constraints_{}.csv'.format(scenario), dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(float)
-
-if scenario == 'existing':
-    hydrol = np.array(['SP']*1+['KP']*1+['LP']*1+['GP']*1+['BP']*1+['MP']*1+['EP']*1)
-    
-elif scenario == 'construction':
-    hydrol = np.array(['SP']*1+['KP']*1+['LP']*1+['GP']*1+['BP']*1+['MP']*1+['EP']*1)
-elif scenario == 'all':
-    hydrol = np.array(['SP']*1+['KP']*1+['LP']*1+['GP']*1+['BP']*1+['MP']*1+['EP']*1)
-    
-
-CHydro_max, CHydro_RoR, CHydro_Peaking = [assets[:, x] * pow(10, -3) for x in range(assets.shape[1])] # CHydro(j), MW to GW
-EHydro = constraints[:, 0] # GWh per year
-hydroProfiles = np.genfromtxt('Data/RoR_{}.csv'.format(scenario), delimiter=',', skip_header=1, usecols=range(4,4+len(Nodel)), encoding=None).astype(float)
-
 # Define constants
 peaking_hours = 4
 peaking_start = 18
 peaking_end = peaking_start + peaking_hours
 
-# Create base arrays
-baseload = np.minimum(hydroProfiles, CHydro_RoR * 1e3)  # MW
-daily_peaking = np.zeros_like(hydroProfiles)
-
-# Time index for hours in a day (0 to 23)
-hourly_index = np.arange(MLoad.shape[0]) % 24
-
-# Boolean mask for peaking hours
-is_peaking_hour = (hourly_index >= peaking_start) & (hourly_index < peaking_end)
-
-# Loop through nodes only
-for j in range(len(CHydro_RoR)):
-    # Only apply peaking if capacity exists
-    if CHydro_Peaking[j] > 0:
-        # Excess generation available over baseload
-        peaking_excess = hydroProfiles[:, j] - baseload[:, j]
-        peaking_excess = np.clip(peaking_excess, 0, CHydro_Peaking[j] * 1e3)  # Cap by peaking MW
-        daily_peaking[:, j] = peaking_excess * is_peaking_hour
- 
-         
-###### CONSTRAINTS ######
-# Energy constraints
-Hydromax = EHydro.sum() * pow(10,3) # GWh to MWh per year
-
-# Transmission constraints
-""" externalImports = 0.05 if node=='Super' else 0
-CDC7max, CDC8max, CDC9max, CDC10max = 4 * [externalImports * MLoad.sum() / MLoad.shape[0] / 1000] # 5%: External interconnections: THKD, INSE, PHSB, MW to GW """
-
-###### TRANSMISSION LOSSES ######
-# HVAC backbone scenario
-ac_flags = np.array([True, True, True, True, True, True, True, True, True, True])
-#else:
-    # HVAC backbone scenario
-#    dc_flags = np.array([False, False, False, False, False, False, True, True, True, True])
-
-TLoss = []
-# ['SPKP', 'KPLP', 'LPGP', 'GPBP', 'BPMP', 'EPMP', 'TISP', 'GILP', 'MIMP', 'KIEP']
-TDistances = [131, 178, 75, 149, 122, 197, 16, 40, 78, 26]
-TDistances = np.array(TDistances)
-for i in range(0,len(ac_flags)):
-    TLoss.append(TDistances[i]*0.07) if ac_flags[i] else TLoss.append(TDistances[i]*0.03)
-TLoss = np.array(TLoss)* pow(10, -3)
-print(TLoss)
-    
 ###### STORAGE SYSTEM CONSTANTS ######
 efficiencyPH = 0.8
 
-###### COST FACTORS ######
-factor = np.genfromtxt('Data/factor_hvac.csv', delimiter=',', usecols=1)
-
 ###### SIMULATION PERIOD ######
 firstyear, finalyear, timestep = (2013, 2022, 1)
 
-###### SCENARIO ADJUSTMENTS #######
-# Node values
-if 'Super' == node:
-    coverage = Nodel
-
-else:
-    if 'APG_PMY_Only' == node:
-        coverage = np.array(['SP', 'KP', 'LP', 'GP', 'BP', 'MP', 'EP'])
-    elif 'APG_BMY_Only' == node:
-        coverage = np.array(['TI','GI', 'MI', 'KI'])
-    else:
-        print("Undefined network structure. Check value of -n command line argument.")
-        exit()
-    
-    pv_ub_np = pv_ub_np[np.where(np.in1d(PVl, coverage)==True)[0]]
-    phes_ub_np = phes_ub_np[np.where(np.in1d(Nodel, coverage)==True)[0]]
-
-    Nodel, PVl, Interl = [x[np.where(np.in1d(x, coverage)==True)[0]] for x in (Nodel, PVl, Interl)]
-    
-    factor = np.genfromtxt('Data/factor_hvac.csv', delimiter=',', usecols=1)
-
-###### DECISION VARIABLE LIST INDEXES ######
-intervals, nodes = MLoad.shape
-years = int(resolution * intervals / 8760)
-pzones = TSPV.shape[1] # Solar PV and wind sites
-pidx, phidx = (pzones, pzones + nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas)
-inters = len(Interl) # Number of external interconnections
-iidx = phidx + 1 + inters # Index of external interconnections, noting pumped hydro energy (network) 
-###### NETWORK CONSTRAINTS ######
-energy = (MLoad).sum() * pow(10, -9) * resolution / years # PWh p.a.
-contingency_ph = list(0.25 * (MLoad).max(axis=0) * pow(10, -3))[:(nodes)] # MW to GW
-
-   
-#manage = 0 # weeks
-allowance = min(0.00002*np.reshape(MLoad.sum(axis=1), (-1, 8760)).sum(axis=-1)) # Allowable annual deficit of 0.002%, MWh
-
-
-###### DECISION VARIABLE UPPER BOUNDS ######
-pv_ub = [x for x in pv_ub_np]
-phes_ub = [x for x in phes_ub_np]
-phes_s_ub = [10000.]
-inters_ub = [500.] * inters if node == 'Super' else inters * [0]
-
-###### DECISION VARIABLE LOWER BOUNDS ######
-pv_lb = [.001] * pzones
+class ModelData:
+    """Input data and assumptions of a scenario: data = ModelData('existing', 'Super', 2, True).
+    With periods, the time series are reduced to that many weighted representative days (Cluster.Reduce);
+    with horizon, to the first horizon years, weighted to stand for the full horizon"""
+
+    def __init__(self, scenario='existing', node='Super', percapita=2, import_flag=True, periods=0, horizon=0):
+        self.scenario, self.node, self.percapita, self.import_flag = (scenario, node, percapita, import_flag)
+        self.periods, self.horizon = (periods, horizon)
+
+        Nodel_, PVl_, pv_ub_np_, phes_ub_np_ = (Nodel, PVl, pv_ub_np, phes_ub_np)
+
+        # Add external interconnections
+        Interl = np.array(['TI']*1 + ['GI']*1 + ['MI']*1 + ['KI']*1) if node == 'Super' else np.array([])
+
+        ###### DATA IMPORTS ######
+        # Time series published in shared memory by the parent optimisation process, if any (Optimisation.py --shared)
+        shared = Attach('{}_{}'.format(scenario, percapita))
+
+        self.MLoad = shared['MLoad'] if shared else genfromtxt('Data/electricity{}.csv'.format(percapita), delimiter=',', skip_header=1, usecols=range(4, 4+len(Nodel_))) # EOLoad(t, j), MW
+        self.TSPV = shared['TSPV'] if shared else genfromtxt('Data/pv.csv', delimiter=',', skip_header=1, usecols=range(4, 4+len(PVl_))) # TSPV(t, i), MW
+
+        assets = genfromtxt('Data/assets_{}.csv'.format(scenario), dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(float)
+        constraints = genfromtxt('Data/constraints_{}.csv'.format(scenario), dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(float)
+
+        self.CHydro_max, self.CHydro_RoR, self.CHydro_Peaking = [assets[:, x] * pow(10, -3) for x in range(assets.shape[1])] # CHydro(j), MW to GW
+        self.EHydro = constraints[:, 0] # GWh per year
+        self.hydroProfiles = shared['hydroProfiles'] if shared else genfromtxt('Data/RoR_{}.csv'.format(scenario), delimiter=',', skip_header=1, usecols=range(4,4+len(Nodel_)), encoding=None).astype(float)
+
+        # Time index for hours in a day (0 to 23)
+        hourly_index = np.arange(self.MLoad.shape[0]) % 24
+
+        # Boolean mask for peaking hours
+        is_peaking_hour = (hourly_index >= peaking_start) & (hourly_index < peaking_end)
+
+        if shared:
+            self.baseload, self.daily_peaking = (shared['baseload'], shared['daily_peaking'])
+        else:
+            # Create base arrays
+            self.baseload = np.minimum(self.hydroProfiles, self.CHydro_RoR * 1e3)  # MW
+            self.daily_peaking = np.zeros_like(self.hydroProfiles)
+
+            # Loop through nodes only
+            for j in range(len(self.CHydro_RoR)):
+                # Only apply peaking if capacity exists
+                if self.CHydro_Peaking[j] > 0:
+                    # Excess generation available over baseload
+                    peaking_excess = self.hydroProfiles[:, j] - self.baseload[:, j]
+                    peaking_excess = np.clip(peaking_excess, 0, self.CHydro_Peaking[j] * 1e3)  # Cap by peaking MW
+                    self.daily_peaking[:, j] = peaking_excess * is_peaking_hour
+
+        # Candidate-invariant part of the netload
+        self.Netbase = self.MLoad.sum(axis=1) - self.baseload.sum(axis=1) # EOLoad(t) - RoR(t), MW
+
+        ###### CONSTRAINTS ######
+        # Energy constraints
+        self.Hydromax = self.EHydro.sum() * pow(10,3) # GWh to MWh per year
+
+        ###### COST FACTORS ######
+        self.factor = genfromtxt('Data/factor_hvac.csv', delimiter=',', usecols=1)
+
+        ###### TRANSMISSION NETWORK ######
+        # Line, From, To, Distance (km), HVAC; positive flow is From -> To, in the order of the line cost factors
+        lines = genfromtxt('Data/lines.csv', dtype=None, delimiter=',', encoding=None)[1:]
+        Linel, ends = (lines[:, 0], lines[:, 1:3])
+        TDistances, ac_flags = (lines[:, 3].astype(float), lines[:, 4].astype(float) == 1)
+        TLoss = TDistances * np.where(ac_flags, 0.07, 0.03) * pow(10, -3) # HVAC or HVDC losses per km
+
+        ###### SCENARIO ADJUSTMENTS #######
+        # Node values
+        if 'Super' == node:
+            coverage = Nodel_
+
+        else:
+            if 'APG_PMY_Only' == node:
+                coverage = np.array(['SP', 'KP', 'LP', 'GP', 'BP', 'MP', 'EP'])
+            elif 'APG_BMY_Only' == node:
+                coverage = np.array(['TI','GI', 'MI', 'KI'])
+            else:
+                raise ValueError("Undefined network structure. Check value of -n command line argument.")
+
+            pv_ub_np_ = pv_ub_np_[np.where(np.isin(PVl_, coverage)==True)[0]]
+            phes_ub_np_ = phes_ub_np_[np.where(np.isin(Nodel_, coverage)==True)[0]]
+
+            Nodel_, PVl_, Interl = [x[np.where(np.isin(x, coverage)==True)[0]] for x in (Nodel_, PVl_, Interl)]
+
+        self.Nodel, self.PVl, self.Interl, self.hydrol, self.coverage = (Nodel_, PVl_, Interl, hydrol, coverage)
+
+        # Incidence(j, k): +1 where line k flows into node j, -1 where it flows out; lines leaving the coverage are left out
+        self.Linel = Linel
+        self.Incidence = (ends[:, 1] == Nodel_[:, None]).astype(float) - (ends[:, 0] == Nodel_[:, None])
+        self.Incidence[:, ~np.isin(ends, Nodel_).all(axis=1)] = 0
+        self.Inverse = np.linalg.pinv(self.Incidence) # Minimum-norm flows(k) meeting the nodal imports(j)
+
+        self.resolution, self.efficiencyPH, self.TLoss = (resolution, efficiencyPH, TLoss)
+        self.peaking_hours, self.firstyear, self.finalyear = (peaking_hours, firstyear, finalyear)
+
+        ###### DECISION VARIABLE LIST INDEXES ######
+        self.intervals, self.nodes = self.MLoad.shape
+        self.years = int(resolution * self.intervals / 8760)
+        self.pzones = self.TSPV.shape[1] # Solar PV and wind sites
+        self.pidx, self.phidx = (self.pzones, self.pzones + self.nodes) # Index of solar PV (sites), wind (sites), pumped hydro power (service areas)
+        self.inters = len(Interl) # Number of external interconnections
+        self.iidx = self.phidx + 1 + self.inters # Index of external interconnections, noting pumped hydro energy (network)
+        ###### NETWORK CONSTRAINTS ######
+        self.energy = (self.MLoad).sum() * pow(10, -9) * resolution / self.years # PWh p.a.
+        self.contingency_ph = list(0.25 * (self.MLoad).max(axis=0) * pow(10, -3))[:(self.nodes)] # MW to GW
+
+        #manage = 0 # weeks
+        self.allowance = min(0.00002*np.reshape(self.MLoad.sum(axis=1), (-1, 8760)).sum(axis=-1)) # Allowable annual deficit of 0.002%, MWh
+
+        ###### DECISION VARIABLE UPPER BOUNDS ######
+        self.pv_ub = [x for x in pv_ub_np_]
+        self.phes_ub = [x for x in phes_ub_np_]
+        self.phes_s_ub = [10000.]
+        self.inters_ub = [500.] * self.inters if node == 'Super' else self.inters * [0]
+
+        ###### DECISION VARIABLE LOWER BOUNDS ######
+        self.pv_lb = [.001] * self.pzones
+
+        ###### REPRESENTATIVE PERIODS ######
+        # After the constants above, which stay those of the full horizon
+        self.weights = None # Intervals of the full horizon represented by each interval, None at full resolution
+        if periods:
+            Cluster.Reduce(self, periods)
+        elif horizon and horizon < self.years:
+            end = int(horizon * 8760 / resolution)
+            self.MLoad, self.TSPV, self.hydroProfiles, self.baseload, self.daily_peaking, self.Netbase = \
+                [array[:end] for array in (self.MLoad, self.TSPV, self.hydroProfiles, self.baseload, self.daily_peaking, self.Netbase)]
+            self.weights = np.full(end, self.intervals / end)
+            self.intervals = end
+
+    def Total(self, x, axis=None):
+        """Sum of x(t) or x(t, j) over the intervals (axis=0) or altogether, weighted when the horizon is reduced to representative periods"""
+        if self.weights is None:
+            return x.sum(axis=axis)
+
+        weighted = self.weights[:len(x)] @ x
+        return weighted if axis == 0 else weighted.sum()
+
+    def __reduce__(self):
+        """Pickled as its scenario only, so that worker processes rebuild it from their own (cached or shared) data"""
+        return (Model, (self.scenario, self.node, self.percapita, self.import_flag, self.periods, self.horizon))
+
+    def __repr__(self):
+        reduced = ''.join(', {}={!r}'.format(name, value) for name, value in (('periods', self.periods), ('horizon', self.horizon)) if value)
+        return 'ModelData({!r}, {!r}, {!r}, {!r}{})'.format(self.scenario, self.node, self.percapita, self.import_flag, reduced)
+
+models = {} # ModelData built by this process
+
+def Model(scenario='existing', node='Super', percapita=2, import_flag=True, periods=0, horizon=0):
+    """data = Input.Model('existing', 'Super', 2, True): the ModelData of a scenario, built once per process"""
 
+    key = (scenario, node, percapita, import_flag, periods, horizon)
+    if key not in models:
+        models[key] = ModelData(*key)
+
+    return models[key]
 
 class Solution:
     """A candidate solution of decision variables CPV(i), CWind(i), CPHP(j), S-CPHS(j)"""
 
-    def __init__(self, x):
+    def __init__(self, x, data):
         self.x = x
-        self.MLoad = MLoad
-        self.intervals, self.nodes = (intervals, nodes)
-        self.resolution = resolution
-        self.baseload = baseload
+        self.data = data
+        self.MLoad, self.TSPV, self.Netbase = (data.MLoad, data.TSPV, data.Netbase)
+        self.intervals, self.nodes = (data.intervals, data.nodes)
+        self.resolution = data.resolution
+        self.baseload = data.baseload
         #self.indiaExportProfiles = indiaExportProfiles
-        self.daily_peaking = daily_peaking
+        self.daily_peaking = data.daily_peaking
+
+        self.CPV = list(x[: data.pidx]) # CPV(i), GW
 
-        self.CPV = list(x[: pidx]) # CPV(i), GW
-       
-        self.GPV = TSPV * np.tile(self.CPV, (intervals, 1)) * pow(10, 3) # GPV(i, t), GW to MW
-       
+        self.GPVsum = data.TSPV @ (np.array(self.CPV) * pow(10, 3)) # Si-GPV(t), GW to MW; GPV(i, t) is built on demand
 
         # self.CPHP = [x[phidx]] # CPHP(j), GW
-        self.CPHP = list(x[pidx: phidx]) # CPHP(j), GW
-        self.CPHS = x[phidx] # S-CPHS(j), GWh
-        self.efficiencyPH = efficiencyPH
-
-        self.CInter = list(x[phidx+1: ]) if node == 'Super' else len(Interl)*[0] #CInter(j), GW
-        self.GIndia = np.tile(self.CInter, (intervals, 1)) * pow(10,3) # GInter(j, t), GW to MW
-
-        self.Nodel, self.PVl, self.Hydrol = (Nodel, PVl, hydrol)
-        self.Interl = Interl
-        self.node = node
-        self.scenario = scenario
-        self.import_flag = import_flag
-        self.allowance = allowance
-        self.coverage = coverage
-        self.TLoss = TLoss
-
-        self.CHydro_RoR = CHydro_RoR
-        self.CHydro_Peaking = CHydro_Peaking
-        self.CHydro_max = CHydro_max
-        
+        self.CPHP = list(x[data.pidx: data.phidx]) # CPHP(j), GW
+        self.CPHS = x[data.phidx] # S-CPHS(j), GWh
+        self.efficiencyPH = data.efficiencyPH
+
+        self.CInter = list(x[data.phidx+1: ]) if data.node == 'Super' else len(data.Interl)*[0] #CInter(j), GW
+
+        self.Nodel, self.PVl, self.Hydrol = (data.Nodel, data.PVl, data.hydrol)
+        self.Interl = data.Interl
+        self.node = data.node
+        self.scenario = data.scenario
+        self.import_flag = data.import_flag
+        self.allowance = data.allowance
+        self.coverage = data.coverage
+        self.TLoss = data.TLoss
+
+        self.CHydro_RoR = data.CHydro_RoR
+        self.CHydro_Peaking = data.CHydro_Peaking
+        self.CHydro_max = data.CHydro_max
+
+
+    @cached_property
+    def GPV(self):
+        """GPV(i, t), MW: only needed by Statistics"""
+        return self.TSPV * np.tile(self.CPV, (self.intervals, 1)) * pow(10, 3)
+
+    @cached_property
+    def GIndia(self):
+        """GInter(j, t), MW: only needed by Statistics"""
+        return np.tile(self.CInter, (self.intervals, 1)) * pow(10,3)
 
     def __repr__(self):
-        """S = Solution(list(np.ones(64))) >> print(S)"""
+        """S = Solution(list(np.ones(64)), data) >> print(S)"""
         return 'Solution({})'.format(self.x)
\ No newline at end of file
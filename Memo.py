@@ -0,0 +1,128 @@
+# Memoisation of the objective function: an LRU cache in memory and an optional sqlite tier on disk
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from collections import OrderedDict
+from multiprocessing.util import Finalize
+import numpy as np
+import hashlib
+import sqlite3
+import os
+
+cache = OrderedDict() # Dataset and quantised x -> objective, least recently used first
+budget, used, tolerance, database = (0, 0, 0., None) # See Memo.Setup
+stats = None # Shared counters of memory hits, disk hits and misses
+fingerprints = {} # Digest of the input data of each scenario
+connection, pending, finalizer = (None, [], None)
+
+def Setup(megabytes, tol=0., path=None, counters=None):
+    """Memo.Setup(256, 1e-6, 'Results/memo.sqlite', Array('l', 3)): enable memoisation in this process"""
+
+    global budget, tolerance, database, stats
+    budget, tolerance, database, stats = (megabytes * pow(2, 20), tol, path, counters)
+
+def Key(x):
+    """Candidates closer than the tolerance (in every coordinate) share a key"""
+
+    x = np.asarray(x, dtype=np.float64)
+    return np.round(x / tolerance).astype(np.int64).tobytes() if tolerance > 0 else x.tobytes()
+
+def Fingerprint(data):
+    """Digest of the inputs that the objective depends on, so that the disk tier never serves another dataset"""
+
+    if repr(data) not in fingerprints:
+        digest = hashlib.sha1(repr(data).encode())
+        for array in (data.MLoad, data.TSPV, data.baseload, data.daily_peaking, data.factor, data.TLoss, data.Incidence):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        fingerprints[repr(data)] = digest.hexdigest()
+
+    return fingerprints[repr(data)]
+
+def Connect():
+    """The sqlite connection of this process, opened on first use (connections must not cross a fork)"""
+
+    global connection
+    if connection is None or connection[0] != os.getpid():
+        handle = sqlite3.connect(database, timeout=60)
+        handle.execute('PRAGMA journal_mode=WAL')
+        handle.execute('CREATE TABLE IF NOT EXISTS memo (data TEXT, tolerance REAL, key BLOB, value REAL, PRIMARY KEY (data, tolerance, key))')
+        connection = (os.getpid(), handle)
+
+    return connection[1]
+
+def Count(i):
+    """Increment a shared counter: 0 memory hits, 1 disk hits, 2 misses"""
+
+    if stats is not None:
+        with stats.get_lock():
+            stats[i] += 1
+
+def Insert(key, value):
+    """Add to the memory tier, evicting the least recently used entries beyond the budget"""
+
+    global used
+    if key not in cache:
+        used += len(key) + 128 # Approximate footprint of an entry
+    cache[key] = value
+    cache.move_to_end(key)
+    while used > budget and cache:
+        evicted, _ = cache.popitem(last=False)
+        used -= len(evicted) + 128
+
+def Lookup(x, data):
+    """The memoised objective of x, or None"""
+
+    if not budget:
+        return None
+
+    key = Key(x)
+    local = repr(data).encode() + key # Reduced horizons (Input.ModelData periods, horizon) have objectives of their own
+    if local in cache:
+        cache.move_to_end(local)
+        Count(0)
+        return cache[local]
+
+    if database is not None:
+        row = Connect().execute('SELECT value FROM memo WHERE data=? AND tolerance=? AND key=?', (Fingerprint(data), tolerance, key)).fetchone()
+        if row is not None:
+            Insert(local, row[0])
+            Count(1)
+            return row[0]
+
+    Count(2)
+    return None
+
+def Store(x, data, value):
+    """Memoise the exact objective of x; results of bounded (aborted) evaluations must not be stored"""
+
+    global finalizer
+    if not budget:
+        return
+
+    key = Key(x)
+    Insert(repr(data).encode() + key, float(value))
+
+    if database is not None:
+        if finalizer is None:
+            finalizer = Finalize(None, Commit, exitpriority=10)
+        pending.append((Fingerprint(data), tolerance, key, float(value)))
+        if len(pending) >= 256:
+            Commit()
+
+def Commit():
+    """Write the pending entries to the disk tier"""
+
+    if pending and database is not None:
+        with Connect() as handle:
+            handle.executemany('INSERT OR REPLACE INTO memo VALUES (?, ?, ?, ?)', pending)
+        pending.clear()
+
+def Report():
+    """Hit-rate statistics of the run"""
+
+    if stats is None:
+        return
+    memory, disk, misses = stats[:]
+    total = max(memory + disk + misses, 1)
+    print('Memoisation: {} hits in memory, {} on disk, {} misses ({:.1%} hit rate)'.format(memory, disk, misses, (memory + disk) / total))
@@ -15,13 +15,12 @@ def Transmission(solution, domestic_only=False, export_only=False, output=False)
     peakingfactor = np.tile(CHydro_Peaking, (intervals, 1)) / sum(CHydro_Peaking) if sum(CHydro_Peaking) != 0 else 0
     MPeaking_long = np.tile(solution.DischargePeaking, (len(CHydro_Peaking), 1)).transpose() * peakingfactor 
 
-    MPV, MBaseload, MPeaking = map(np.zeros, [(nodes, intervals)] * 3)
-    for i, j in enumerate(Nodel):
-        MPV[i, :] = solution.GPV[:, np.where(PVl==j)[0]].sum(axis=1)
-        # MWind[i, :] = solution.GWind[:, np.where(Windl==j)[0]].sum(axis=1)
-        MBaseload[i, :] = solution.baseload[:, np.where(Hydrol==j)[0]].sum(axis=1)
-        MPeaking[i, :] = MPeaking_long[:, np.where(Hydrol==j)[0]].sum(axis=1)
-    MPV, MBaseload, MPeaking = (MPV.transpose(), MBaseload.transpose(), MPeaking.transpose()) # Sij-GPV(t, i), Sij-GWind(t, i), MW
+    # Site-to-node aggregation matrices
+    PVnodes, Hydronodes = ((PVl[:, None] == Nodel).astype(float), (Hydrol[:, None] == Nodel).astype(float))
+    MPV = solution.TSPV @ (np.array(solution.CPV)[:, None] * PVnodes) * pow(10, 3) # Sij-GPV(t, j), GW to MW
+    # MWind = solution.GWind @ Windnodes
+    MBaseload = solution.baseload[:, :len(Hydrol)] @ Hydronodes # MW
+    MPeaking = MPeaking_long[:, :len(Hydrol)] @ Hydronodes # MW
     
     MLoad = solution.MLoad # EOLoad(t, j), MW
 
@@ -94,30 +93,13 @@ def Transmission(solution, domestic_only=False, export_only=False, output=False)
     
     coverage = solution.coverage
     if len(coverage) > 1:
+        # Line flows meeting the nodal imports, Data/lines.csv: MImport(t, j) = TDC(t, k) Incidence(j, k)
+        Incidence, Inverse = (solution.data.Incidence, solution.data.Inverse)
+        TDC = MImport @ Inverse.transpose() # TDC(t, k), MW
 
-       # ['SPKP', 'KPLP', 'LPGP', 'GPBP', 'BPMP', 'EPMP', 'TISP', 'GILP', 'MIMP', 'KIEP']
-
-        #these are the external node so calculation woulde be −1 × 𝑅𝑒𝑞𝑢𝑖𝑟𝑒𝑑 𝐼𝑚𝑝𝑜𝑟𝑡 (𝑡, GI) 
-        TISP =  1 * MImport[:, np.where(Nodel=='TI')[0][0]] if 'TI' in coverage else np.zeros(intervals)
-        GILP =  1 * MImport[:, np.where(Nodel=='GI')[0][0]] if 'GI' in coverage else np.zeros(intervals)
-        KIEP =  1 * MImport[:, np.where(Nodel=='KI')[0][0]] if 'KI' in coverage else np.zeros(intervals)
-        MIMP =  -1 * MImport[:, np.where(Nodel=='MI')[0][0]] if 'MI' in coverage else np.zeros(intervals)
-       
-    
-        #Imports into inner internal nodes 
-        SPKP = -1 * MImport[:, np.where(Nodel=='SP')[0][0]] - TISP if 'SP' in coverage else np.zeros(intervals)
-
-        #we need to calculate node to node connection so we need to substract in between node.
-        KPLP = MImport[:, np.where(Nodel=='KP')[0][0]] - SPKP  if 'KP' in coverage else np.zeros(intervals)
-        EPMP = -1 * MImport[:, np.where(Nodel=='EP')[0][0]] - KIEP if 'EP' in coverage else np.zeros(intervals)
-        LPGP = -1 * MImport[:, np.where(Nodel=='LP')[0][0]] - GILP - KPLP if 'LP' in coverage else np.zeros(intervals)
-        GPBP = 1 * MImport[:, np.where(Nodel=='GP')[0][0]] - LPGP if 'GP' in coverage else np.zeros(intervals)
-        BPMP = -1 * MImport[:, np.where(Nodel=='BP')[0][0]] - GPBP  if 'BP' in coverage else np.zeros(intervals)
-        
-        #Check the final node
-        BPMP1 = 1 *  MImport[:, np.where(Nodel=='MP')[0][0]] - MIMP - EPMP if 'MP' in coverage else np.zeros(intervals)
-        assert abs(BPMP - BPMP1).max() <= 0.1, print('BPMP Error', abs(BPMP - BPMP1).max())
-        TDC = np.array([SPKP, KPLP, LPGP, GPBP, BPMP, EPMP, TISP, GILP, MIMP, KIEP ]).transpose() # TDC(t, k), MW
+        # Energy balance: the flows can only meet the imports when the network is balanced
+        Imbalance = abs(TDC @ Incidence.transpose() - MImport).max()
+        assert Imbalance <= 0.1, print('Network Error', Imbalance)
     else:
         TDC = np.zeros((intervals, len(solution.TLoss)))
     if output:
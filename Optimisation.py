@@ -7,6 +7,7 @@ from scipy.optimize import differential_evolution
 from argparse import ArgumentParser
 import datetime as dt
 import csv
+import json
 import os
 
 parser = ArgumentParser()
@@ -18,52 +19,84 @@ parser.add_argument('-e', default=2, type=int, required=False, help='per-capita
 parser.add_argument('-n', default='Super', type=str, required=False, help='Super, SP, KP...')
 parser.add_argument('-s', default='existing', type=str, required=False, help='existing,construction')
 parser.add_argument('-y', default='import', type=str, required=False, help='import, no_import')
+parser.add_argument('-b', action='store_true', help='bounded evaluation: abort candidates whose deficit penalty exceeds the best objective of the last generation, scoring them with an estimate')
+parser.add_argument('--shared', action='store_true', help='load time series once into shared memory for the worker processes')
+parser.add_argument('-v', default=0, type=int, required=False, help='vectorised objective: candidates per batch, 0 = off')
+parser.add_argument('-c', default=0, type=float, required=False, help='memoisation cache per process in MB, 0 = off')
+parser.add_argument('--tol', default=0., type=float, required=False, help='memoisation: candidates closer than tol share an objective, 0 = exact')
+parser.add_argument('--memo', action='store_true', help='memoisation: keep results on disk in Results/memo_*.sqlite for repeat runs')
+parser.add_argument('--checkpoint', default=1, type=int, required=False, help='save the population every n generations to Results/checkpoint_*.npz, removed once the run completes, 0 = off')
+parser.add_argument('--resume', action='store_true', help='continue from Results/checkpoint_*.npz')
+parser.add_argument('--seed-from', default=None, type=str, required=False, help='initial population from the best rows of a record (csv or Results/record_*/) or an Optimisation_resultx_*.csv')
+parser.add_argument('--profile', action='store_true', help='report evaluations/s, mean ms per stage of the objective and peak memory of each process every generation')
+parser.add_argument('--output', default=['csv'], nargs='+', choices=['csv', 'npz'], required=False, help='formats of the load profiles and generation mix: csv (a file per node), npz (a single file)')
+parser.add_argument('--periods', default=0, type=int, required=False, help='optimise on this many weighted representative days (k-medoids), then verify the best candidates at full resolution, 0 = off')
+parser.add_argument('--fidelity', default=None, type=str, required=False, help='horizon schedule, e.g. 1y:200,3y:400,full: the first 1 year until generation 200, 3 years until 400, then the full horizon')
+parser.add_argument('--verify', default=5, type=int, required=False, help='representative days: candidates of the final population re-scored at full resolution')
 #parser.add_argument('-f', default='HVAC', type=str, required=False, help='ac_flag, no_import')
-args = parser.parse_args()
 
-scenario = args.s
-node = args.n
-percapita = args.e
-#ac_flag = args.f
-import_flag = (args.y == 'import')
-
-from Input import *
-from Simulation import Reliability
+import numpy as np
+from Input import Model, Solution
+from Simulation import Reliability, ReliabilityBatch
 from Network import Transmission
+from multiprocessing import Pool, Value, Array, cpu_count
+from Shared import Publish
+import Records
+import Memo
+import Profile
+
+incumbent, aborted = (None, None) # Shared best objective and count of short-circuited evaluations, see Optimisation.Share
+checkpoint, generation, rng = (None, 0, None) # Checkpoint file and interval, generations completed and the random generator of differential_evolution
+
+def F(x, data):
+    """This is the objective function: F(x, Input.Model('existing', 'Super', 2, True))"""
+
+    intervals, resolution, years, allowance = (data.intervals, data.resolution, data.years, data.allowance)
+    baseload, daily_peaking, peaking_hours = (data.baseload, data.daily_peaking, data.peaking_hours)
 
-def F(x):
-    """This is the objective function."""
+    Func = Memo.Lookup(x, data)
+    if Func is not None:
+        return Func
 
     # Initialise the optimisation
-    S = Solution(x)
+    Profile.Mark()
+    S = Solution(x, data)
+    Profile.Mark('Solution')
 
     CIndia = np.nan_to_num(np.array(S.CInter))
 
-    if import_flag == True:
+    # Bounded evaluation: stop simulating once the deficit penalty alone exceeds the best objective so far
+    bound = incumbent.value + allowance if incumbent is not None else None
+
+    if data.import_flag == True:
+        # Simulation with baseload, all existing capacity
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=np.ones(intervals) * CIndia.sum() * pow(10,3), daily_peaking=daily_peaking, peaking_hours=peaking_hours, bound=bound)
+        Profile.Mark('Reliability')
+        if S.simulated < intervals:
+            Func = Abort([x], [Deficit], [S.simulated], data)[0]
+            Profile.Done()
+            return Func
+
+        # Deficit penalty function
+        PenDeficit = max(0, data.Total(Deficit) * resolution - S.allowance)
+
         # Simulation with only baseload
         Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargePeaking1, Spillage1 = Reliability(S, baseload=baseload, india_imports=np.zeros(intervals), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
-        Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
+        Profile.Mark('Reliability')
         PIndia = Deficit1.max() * pow(10, -3) # GW
 
-        GIndia = resolution * (Max_deficit1).max() / efficiencyPH
-
         PenPower = abs(PIndia - CIndia.sum()) * pow(10,3)
         PenEnergy = 0
-        
-        # Simulation with baseload, all existing capacity
-        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=np.ones(intervals) * CIndia.sum() * pow(10,3), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
-
-        # Deficit penalty function
-        PenDeficit = max(0, Deficit.sum() * resolution - S.allowance)
 
         # India import profile
         india_imports = np.clip(Deficit1, 0, CIndia.sum() * pow(10,3)) # MW
 
         # Simulation using the existing capacity generation profiles - required for storage average annual discharge
         Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+        Profile.Mark('Reliability')
 
         # Discharged energy from storage systems
-        GPHES = DischargePH.sum() * resolution / years * pow(10,-6) # TWh per year
+        GPHES = data.Total(DischargePH) * resolution / years * pow(10,-6) # TWh per year
     else:
         PenPower = 0
         PenEnergy = 0
@@ -71,58 +104,374 @@ def F(x):
         india_imports = np.zeros(intervals)
 
         # Simulation using the existing capacity generation profiles - required for storage average annual discharge
-        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours, bound=bound)
+        Profile.Mark('Reliability')
+        if S.simulated < intervals:
+            Func = Abort([x], [Deficit], [S.simulated], data)[0]
+            Profile.Done()
+            return Func
 
         # Deficit penalty function
-        PenDeficit = max(0, Deficit.sum() * resolution - S.allowance)
+        PenDeficit = max(0, data.Total(Deficit) * resolution - S.allowance)
 
         # Discharged energy from storage systems
-        GPHES = DischargePH.sum() * resolution / years * pow(10,-6) # TWh per year
-
-    # Transmission capacity calculations
-    TDC = Transmission(S, domestic_only=True, output=True) if 'Super' in node else np.zeros((intervals, len(TLoss)))
-    CAC = np.amax(abs(TDC), axis=0) * pow(10, -3) # CDC(k), MW to GW
+        GPHES = data.Total(DischargePH) * resolution / years * pow(10,-6) # TWh per year
 
     # Transmission penalty function
     PenDC = 0
 
+    LCOE = Cost(S, GPHES, india_imports, DischargePeaking)
+    Profile.Mark('Cost')
+
+    Record([np.append(x,[PenDeficit+PenEnergy+PenPower+PenDC,PenDeficit,PenEnergy,PenPower,LCOE])], data)
+    Profile.Mark('Record')
+    Profile.Done()
+
+    Func = LCOE + PenDeficit + PenEnergy + PenPower + PenDC
+    Memo.Store(x, data, Func)
+    
+    return Func
+
+def F_batch(X, data, batch):
+    """Vectorised objective function: X(i, p) is a batch of candidates as passed by differential_evolution(vectorized=True)"""
+
+    X = np.atleast_2d(X.T) # X(p, i)
+    Func = np.array([Memo.Lookup(x, data) for x in X], dtype=float) # nan unless memoised
+
+    todo = np.where(np.isnan(Func))[0]
+    for b in range(0, len(todo), batch):
+        Func[todo[b:b + batch]] = Population(X[todo[b:b + batch]], data)
+
+    return Func
+
+def Population(X, data):
+    """The objective function for each row of X(p, i), simulating the population together"""
+
+    intervals, resolution, years, allowance = (data.intervals, data.resolution, data.years, data.allowance)
+    baseload, daily_peaking, peaking_hours = (data.baseload, data.daily_peaking, data.peaking_hours)
+
+    Profile.Mark()
+    solutions = [Solution(x, data) for x in X]
+    Profile.Mark('Solution')
+    Func = np.zeros(len(X))
+
+    CIndia = np.array([np.nan_to_num(np.array(S.CInter)).sum() for S in solutions])
+
+    # Bounded evaluation: stop simulating once the deficit penalty alone exceeds the best objective so far
+    bound = incumbent.value + allowance if incumbent is not None else None
+
+    if data.import_flag == True:
+        # Simulation with baseload, all existing capacity
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = ReliabilityBatch(solutions, baseload=baseload, india_imports=np.ones((len(X), intervals)) * CIndia[:, None] * pow(10,3), daily_peaking=daily_peaking, peaking_hours=peaking_hours, bound=bound)
+    else:
+        # Simulation using the existing capacity generation profiles - required for storage average annual discharge
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = ReliabilityBatch(solutions, baseload=baseload, india_imports=np.zeros((len(X), intervals)), daily_peaking=daily_peaking, peaking_hours=peaking_hours, bound=bound)
+
+    Profile.Mark('Reliability')
+    simulated = np.array([S.simulated for S in solutions])
+    stopped = simulated < intervals
+    if stopped.any():
+        Func[stopped] = Abort(X[stopped], Deficit[stopped], simulated[stopped], data)
+        if stopped.all():
+            Profile.Done(len(X))
+            return Func
+
+    X, solutions, CIndia, Deficit = (X[~stopped], [S for S, a in zip(solutions, stopped) if not a], CIndia[~stopped], Deficit[~stopped])
+
+    # Deficit penalty function
+    PenDeficit = np.array([max(0, data.Total(D) * resolution - allowance) for D in Deficit])
+
+    if data.import_flag == True:
+        # Simulation with only baseload
+        Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargePeaking1, Spillage1 = ReliabilityBatch(solutions, baseload=baseload, india_imports=np.zeros(intervals), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+        PIndia = Deficit1.max(axis=1) * pow(10, -3) # GW
+
+        Profile.Mark('Reliability')
+        PenPower = abs(PIndia - CIndia) * pow(10,3)
+        PenEnergy = np.zeros(len(X))
+
+        # India import profile
+        india_imports = np.clip(Deficit1, 0, CIndia[:, None] * pow(10,3)) # MW
+
+        # Simulation using the existing capacity generation profiles - required for storage average annual discharge
+        Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = ReliabilityBatch(solutions, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+        Profile.Mark('Reliability')
+    else:
+        PenPower = np.zeros(len(X))
+        PenEnergy = np.zeros(len(X))
+
+        india_imports = np.zeros((len(X), intervals))
+        DischargePH, DischargePeaking = (DischargePH[~stopped], DischargePeaking[~stopped])
+
+    # Discharged energy from storage systems
+    GPHES = np.array([data.Total(D) * resolution / years * pow(10,-6) for D in DischargePH]) # TWh per year
+
+    # Transmission penalty function
+    PenDC = np.zeros(len(X))
+
+    LCOE = np.array([Cost(S, GPHES[p], india_imports[p], DischargePeaking[p]) for p, S in enumerate(solutions)])
+    Profile.Mark('Cost')
+
+    Record(np.column_stack([X, PenDeficit+PenEnergy+PenPower+PenDC, PenDeficit, PenEnergy, PenPower, LCOE]), data)
+    Profile.Mark('Record')
+    Profile.Done(len(stopped))
+
+    Func[~stopped] = LCOE + PenDeficit + PenEnergy + PenPower + PenDC
+    for x, f in zip(X, Func[~stopped]): # X holds the candidates that were not stopped
+        Memo.Store(x, data, f)
+
+    return Func
+
+def Abort(X, Deficit, simulated, data):
+    """Stand-in objective of candidates whose bounded evaluation (-b) stopped early: the deficit penalty extrapolated
+    from the simulated share of the horizon, in place of their true objective. It is above the incumbent they were stopped
+    against, but that incumbent is the best of an earlier generation, and the value is an estimate rather than a bound of
+    the true objective, so a bounded run can select differently from, and end at another optimum than, an unbounded one"""
+
+    intervals, resolution, allowance = (data.intervals, data.resolution, data.allowance)
+
+    if data.weights is None:
+        PenDeficit = np.array([D[:n].sum() * resolution * intervals / n - allowance for D, n in zip(Deficit, simulated)])
+    else:
+        # Representative periods: extrapolated from the share of the weights simulated
+        PenDeficit = np.array([data.Total(D[:n]) * resolution * data.weights.sum() / data.weights[:n].sum() - allowance for D, n in zip(Deficit, simulated)])
+
+    Record(np.column_stack([np.reshape(X, (len(PenDeficit), -1)), PenDeficit, PenDeficit, np.zeros(len(PenDeficit)), np.zeros(len(PenDeficit)), np.full(len(PenDeficit), np.nan)]), data)
+    Profile.Mark('Record')
+
+    with aborted.get_lock():
+        aborted.value += len(PenDeficit)
+
+    return PenDeficit
+
+def Cost(S, GPHES, india_imports, DischargePeaking):
+    """Levelised cost of electricity of a simulated solution"""
+
+    data = S.data
+    intervals, resolution, years, efficiencyPH = (data.intervals, data.resolution, data.years, data.efficiencyPH)
+    baseload, factor, energy, TLoss = (data.baseload, data.factor, data.energy, data.TLoss)
+
+    # Transmission capacity calculations
+    TDC = Transmission(S, domestic_only=True, output=True) if 'Super' in data.node else np.zeros((intervals, len(TLoss)))
+    CAC = np.amax(abs(TDC), axis=0) * pow(10, -3) # CDC(k), MW to GW
+    Profile.Mark('Transmission')
+
     # Average annual electricity generated by existing capacity
-    GHydro = resolution * (baseload.sum() + DischargePeaking.sum()) / efficiencyPH / years
+    GHydro = resolution * (data.Total(baseload) + data.Total(DischargePeaking)) / efficiencyPH / years
     
     # Average annual electricity imported through external interconnections
-    GIndia = resolution * india_imports.sum() / years / efficiencyPH
+    GIndia = resolution * data.Total(india_imports) / years / efficiencyPH
 
     # Levelised cost of electricity calculation
     cost = factor * np.array([sum(S.CPV),0, GIndia * pow(10,-6), sum(S.CPHP), S.CPHS, GPHES] + list(CAC) + [sum(S.CPV),0, (GHydro) * pow(10, -6)]) # $b p.a.
     cost = cost.sum()
-    loss = np.sum(abs(TDC), axis=0) * TLoss
+    loss = data.Total(abs(TDC), axis=0) * TLoss
     loss = loss.sum() * pow(10, -9) * resolution / years # PWh p.a.
     LCOE = cost / abs(energy - loss) 
 
-    if not os.path.exists('Results'):
-        os.makedirs('Results')
+    return LCOE
 
-    with open('Results/record_{}_{}_{}_{}.csv'.format(node, scenario, percapita, import_flag), 'a', newline="") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(np.append(x,[PenDeficit+PenEnergy+PenPower+PenDC,PenDeficit,PenEnergy,PenPower,LCOE]))
+def Record(rows, data):
+    """Append evaluated candidates and their penalties to the record, Results/record_*/ (see Records.Read)"""
 
+    reduced = '_{}d'.format(data.periods) if data.periods else '_{}y'.format(data.horizon) if data.weights is not None else ''
+    Records.Append('record_{}_{}_{}_{}{}'.format(data.node, data.scenario, data.percapita, data.import_flag, reduced), rows)
 
-    Func = LCOE + PenDeficit + PenEnergy + PenPower + PenDC
-    
-    return Func
+def Share(best, count, memo=None, profile=None):
+    """Pool initialiser: the best objective and the short-circuit counter shared between processes, the Memo.Setup arguments and the Profile table"""
+
+    global incumbent, aborted
+    incumbent, aborted = (best, count)
+    if memo is not None:
+        Memo.Setup(*memo)
+    if profile is not None:
+        Profile.Setup(profile)
+
+def Generation(intermediate_result):
+    """Callback after each generation: publish the best objective to the workers for bounded evaluation and save a checkpoint"""
+
+    global generation
+    generation += 1
+
+    if incumbent is not None:
+        incumbent.value = intermediate_result.fun
+        with aborted.get_lock():
+            print("Short-circuited evaluations:", aborted.value)
+            aborted.value = 0
+
+    Profile.Report(generation)
+
+    if checkpoint is not None and checkpoint[1] > 0 and generation % checkpoint[1] == 0:
+        Save(checkpoint[0], intermediate_result.population, intermediate_result.population_energies)
+
+def Save(path, population, energies):
+    """Write the population, its objectives, the generation count and the random generator state, atomically"""
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        np.savez(f, population=population, energies=energies, generation=generation, rng=json.dumps(rng.bit_generator.state))
+    os.replace(temporary, path)
+
+def Resume(path):
+    """population, energies = Optimisation.Resume(path): restore the generation count and random generator from a checkpoint"""
+
+    global generation
+    with np.load(path) as saved:
+        generation = int(saved['generation'])
+        rng.bit_generator.state = json.loads(str(saved['rng']))
+        return saved['population'], saved['energies']
+
+def Fidelity(schedule, maxiter):
+    """Optimisation.Fidelity('1y:200,3y:400,full', 600): [(1, 200), (3, 400), (0, 600)], the horizon in years (0 = full)
+    until each generation. The last stage is always the full horizon, so that the result is scored on all the data"""
+
+    stages = []
+    for stage in schedule.split(','):
+        horizon, _, end = stage.strip().partition(':')
+        horizon = 0 if horizon == 'full' else int(horizon.rstrip('y'))
+        stages.append((horizon, int(end) if end else maxiter))
+
+    if stages[-1][0] != 0:
+        stages.append((0, maxiter))
+
+    ends = [end for horizon, end in stages]
+    assert ends == sorted(ends) and ends[-1] <= maxiter, 'Fidelity stages must end in increasing generations, at most -i'
+
+    return stages
+
+def Verify(population, energies, data, count):
+    """The best of the count best distinct candidates of a reduced horizon (--periods), re-scored at full resolution"""
+
+    global incumbent
+    incumbent = None # The objectives of the reduced horizon bound nothing at full resolution
+
+    order = np.argsort(energies)
+    population, energies = (population[order], energies[order])
+    first = np.sort(np.unique(population, axis=0, return_index=True)[1])[:count]
+
+    scores = [F(x, data) for x in population[first]]
+    for reduced, full in zip(energies[first], scores):
+        print('Representative days: objective {:.6f}, full resolution {:.6f}'.format(reduced, full))
+
+    return population[first[np.argmin(scores)]]
+
+def Members(lb, ub, popsize):
+    """Rows of the population of differential_evolution(popsize=popsize): popsize per decision variable that is not fixed, at least 5"""
+
+    return max(5, popsize * max(1, int((np.array(lb) != np.array(ub)).sum())))
+
+def Seed(path, lb, ub, popsize):
+    """Initial population of differential_evolution(popsize=popsize): the best distinct candidates of an earlier record or result, topped up with random candidates"""
+
+    if os.path.isdir(path):
+        rows = Records.Read(os.path.relpath(path, 'Results'))
+    else:
+        rows = np.atleast_2d(np.genfromtxt(path, delimiter=','))
+
+    size = Members(lb, ub, popsize)
+    lb, ub = (np.array(lb), np.array(ub))
+    if rows.shape[1] == len(lb) + 5:
+        # Record: x, total penalty, deficit, energy and power penalties, LCOE
+        Func = rows[:, -5] + rows[:, -1]
+        rows = rows[np.isfinite(Func)][np.argsort(Func[np.isfinite(Func)]), :len(lb)]
+    assert rows.shape[1] == len(lb), 'Seed does not match the decision variables of this scenario'
+
+    rows = np.clip(rows, lb, ub)
+    best = rows[np.sort(np.unique(rows, axis=0, return_index=True)[1])][:size]
+    random = lb + rng.random((size - len(best), len(lb))) * (ub - lb)
+    print('Seeding', len(best), 'of', size, 'candidates from', path)
+
+    return np.vstack([best, random])
 
 if __name__=='__main__':
+    args = parser.parse_args()
+
+    scenario = args.s
+    node = args.n
+    percapita = args.e
+    #ac_flag = args.f
+    import_flag = (args.y == 'import')
+
+    if args.periods and args.fidelity:
+        parser.error('--periods and --fidelity are alternative reduced horizons')
+    full = Model(scenario, node, percapita, import_flag)
+    data = Model(scenario, node, percapita, import_flag, args.periods) if args.periods else full
+    if args.periods:
+        print('Representative days:', len(data.representatives), 'of', full.intervals * full.resolution // 24)
+
     starttime = dt.datetime.now()
     print("Optimisation starts at", starttime)
 
+    lb = data.pv_lb  + data.contingency_ph + [0.] + [0.] * data.inters
+    ub = data.pv_ub + data.phes_ub + data.phes_s_ub + data.inters_ub
 
+    if not os.path.exists('Results'):
+        os.makedirs('Results')
 
-    lb = pv_lb  + contingency_ph + [0.] + [0.] * inters
-    ub = pv_ub + phes_ub + phes_s_ub + inters_ub
-
-    result = differential_evolution(func=F, bounds=list(zip(lb, ub)), tol=0, # init=start,
-                                    maxiter=args.i, popsize=args.p, mutation=args.m, recombination=args.r,
-                                    disp=True, polish=False, updating='deferred', workers=-1) ###### CHANGE WORKERS BACK TO -1
+    memo = (args.c, args.tol, 'Results/memo_{}_{}_{}_{}.sqlite'.format(node, scenario, percapita, import_flag) if args.memo else None, Array('l', 3)) if args.c else None
+
+    profile = Array('d', (cpu_count() + 1) * Profile.width) if args.profile else None # A row for each worker and this process
+    Share(Value('d', np.inf) if args.b else None, Value('l', 0), memo, profile)
+
+    # Checkpoints hold the population and the random generator, so that a resumed run continues where it stopped
+    rng = np.random.default_rng()
+    checkpoint = ('Results/checkpoint_{}_{}_{}_{}{}.npz'.format(node, scenario, percapita, import_flag, '_{}d'.format(args.periods) if args.periods else ''), args.checkpoint)
+    start = 'latinhypercube'
+    if args.resume and os.path.exists(checkpoint[0]):
+        start, energies = Resume(checkpoint[0])
+        if len(start) != Members(lb, ub, args.p):
+            parser.error('{} holds a population of {}, not of {} for -p {}'.format(checkpoint[0], len(start), Members(lb, ub, args.p), args.p))
+        if incumbent is not None:
+            incumbent.value = energies.min()
+        print('Resuming at generation', generation, 'with objective', energies.min())
+    elif args.seed_from:
+        start = Seed(args.seed_from, lb, ub, args.p)
+
+    if args.shared:
+        # Workers attach to these instead of parsing the CSV files again
+        Publish('{}_{}'.format(scenario, percapita), MLoad=full.MLoad, TSPV=full.TSPV, hydroProfiles=full.hydroProfiles, baseload=full.baseload, daily_peaking=full.daily_peaking)
+
+    pool = Pool(processes=cpu_count(), initializer=Share, initargs=(incumbent, aborted, memo, profile)) if not args.v else None
+
+    # Each stage continues from the population of the one before, which differential_evolution re-scores on its horizon
+    stages = Fidelity(args.fidelity, args.i) if args.fidelity else [(0, args.i)]
+    for s, (horizon, end) in enumerate(stages):
+        if end <= generation and s < len(stages) - 1:
+            continue # Completed before a resume
+
+        fidelity = Model(scenario, node, percapita, import_flag, horizon=horizon) if horizon else data
+        if generation == (stages[s - 1][1] if s else 0) and incumbent is not None:
+            # From its first generation, resumed or not: the objectives of the last horizon bound nothing on this one.
+            # Only a resume within the stage keeps the bound of its checkpoint
+            incumbent.value = np.inf
+
+        began, first = (dt.datetime.now(), generation)
+        result = differential_evolution(func=F_batch if args.v else F, args=(fidelity, args.v) if args.v else (fidelity,), bounds=list(zip(lb, ub)), tol=0, init=start, seed=rng,
+                                        maxiter=max(end - generation, 0), popsize=args.p, mutation=args.m, recombination=args.r,
+                                        disp=True, polish=False, updating='deferred', workers=pool.map if pool else 1, vectorized=args.v > 0,
+                                        callback=Generation) ###### CHANGE WORKERS BACK TO -1
+        start = result.population
+
+        if args.fidelity:
+            # The initial population and each generation
+            print('Fidelity {}: generations {} to {}, {} evaluations in {}, objective {}'.format('{} years'.format(horizon) if horizon else 'full horizon',
+                                                                                              first, generation, len(start) * (generation - first + 1), dt.datetime.now() - began, result.fun))
+
+    # The checkpoint is only for an interrupted run: a later --resume must not pick up the population of a finished one
+    if os.path.exists(checkpoint[0]):
+        os.remove(checkpoint[0])
+
+    if pool:
+        # Let the workers exit normally so that they write their buffered records
+        pool.close()
+        pool.join()
+    Records.Flush()
+    Memo.Commit()
+    Memo.Report()
+
+    if args.periods:
+        result.x = Verify(result.population, result.population_energies, full, args.verify)
+        Records.Flush()
 
     with open('Results/Optimisation_resultx_{}_{}_{}_{}.csv'.format(node,scenario,percapita,import_flag), 'w', newline="") as csvfile:
         writer = csv.writer(csvfile)
@@ -131,5 +480,7 @@ if __name__=='__main__':
     endtime = dt.datetime.now()
     print("Optimisation took", endtime - starttime)
 
+    import Statistics
+    Statistics.output = args.output
     from Fill import Analysis
-    Analysis(result.x,'_{}_{}_{}_{}.csv'.format(node,scenario,percapita,import_flag))
+    Analysis(result.x,'_{}_{}_{}_{}.csv'.format(node,scenario,percapita,import_flag), full)
@@ -0,0 +1,77 @@
+# Opt-in timing of the stages of the objective function and peak memory, aggregated over the worker processes
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from time import perf_counter
+import resource
+import os
+
+stages = ('Solution', 'Reliability', 'Transmission', 'Cost', 'Record')
+width = 3 + len(stages) # Per process: pid, evaluations, peak RSS (MB), seconds in each stage
+
+table = None # Shared Array('d', processes * width), None when profiling is off (see Profile.Setup)
+clock, seconds, started = (None, [0.] * len(stages), None)
+
+def Setup(shared):
+    """Profile.Setup(Array('d', processes * Profile.width)): enable profiling in this process"""
+
+    global table, started
+    table, started = (shared, perf_counter())
+
+def Mark(stage=None):
+    """Profile.Mark('Reliability'): the time since the last mark was spent in a stage; Profile.Mark() starts an evaluation"""
+
+    global clock
+    if table is None:
+        return
+
+    now = perf_counter()
+    if stage is not None and clock is not None:
+        seconds[stages.index(stage)] += now - clock
+    clock = now
+
+def Done(evaluations=1):
+    """Add the evaluations and the stage times of this process to its row of the shared table"""
+
+    global clock
+    if table is None:
+        return
+
+    pid, rss = (os.getpid(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024) # kB to MB (Linux)
+    with table.get_lock():
+        rows = [table[r * width:(r + 1) * width] for r in range(len(table) // width)]
+        r = next((r for r, row in enumerate(rows) if row[0] == pid), None)
+        if r is None:
+            r = next(r for r, row in enumerate(rows) if row[0] == 0) # First empty row
+            table[r * width] = pid
+        table[r * width + 1] += evaluations
+        table[r * width + 2] = max(table[r * width + 2], rss)
+        for s in range(len(stages)):
+            table[r * width + 3 + s] += seconds[s]
+
+    seconds[:] = [0.] * len(stages)
+    clock = None
+
+def Report(generation):
+    """Per-process evaluations per second, mean milliseconds per stage and peak memory since the last report, then reset"""
+
+    global started
+    if table is None:
+        return
+
+    now = perf_counter()
+    elapsed, started = (now - started, now)
+    with table.get_lock():
+        rows = [table[r * width:(r + 1) * width] for r in range(len(table) // width)]
+        for r in range(len(rows)):
+            for k in range(1, width):
+                if k != 2: # Peak memory is kept
+                    table[r * width + k] = 0
+
+    print('Profile of generation {} ({:.2f} s):'.format(generation, elapsed))
+    print('{:>8} {:>8} {:>8} {:>9} '.format('pid', 'evals', 'evals/s', 'RSS (MB)') + ' '.join('{:>12}'.format(s + ' ms') for s in stages))
+    for row in rows:
+        if row[0] and row[1]:
+            print('{:>8} {:>8} {:>8.1f} {:>9.0f} '.format(int(row[0]), int(row[1]), row[1] / elapsed, row[2])
+                  + ' '.join('{:>12.3f}'.format(row[3 + s] / row[1] * 1e3) for s in range(len(stages))))
@@ -0,0 +1,60 @@
+# Buffered binary log of the candidates evaluated by the optimisation
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from multiprocessing.util import Finalize
+import numpy as np
+import time
+import glob
+import os
+
+chunk = 1024 # Rows buffered per process before a shard is written
+buffers = {} # Rows not yet written by this process, per record
+finalizer = None
+
+def Append(name, rows):
+    """Records.Append('record_Super_existing_2_True', rows): buffer rows for Results/<name>/*.npy"""
+
+    global finalizer
+    if finalizer is None:
+        # Runs at exit of the main process and of pool workers that are closed and joined (not terminated)
+        finalizer = Finalize(None, Flush, exitpriority=10)
+
+    buffer = buffers.setdefault(name, [])
+    buffer.extend(np.asarray(row, dtype=np.float64) for row in rows)
+    if len(buffer) >= chunk:
+        Flush(name)
+
+def Flush(name=None):
+    """Write the buffered rows of a record (or of all records) as one .npy shard each"""
+
+    for record in [name] if name is not None else list(buffers):
+        rows = buffers.pop(record, [])
+        if not rows:
+            continue
+
+        directory = os.path.join('Results', record)
+        os.makedirs(directory, exist_ok=True)
+
+        # One shard per flush: processes never write to the same file
+        shard = os.path.join(directory, '{}_{}.npy'.format(time.time_ns(), os.getpid()))
+        with open(shard + '.tmp', 'wb') as f:
+            np.save(f, np.array(rows))
+        os.replace(shard + '.tmp', shard)
+
+def Read(name):
+    """Records.Read('record_Super_existing_2_True'): all rows of a record, merged from its shards"""
+
+    Flush(name)
+    shards = sorted(glob.glob(os.path.join('Results', name, '*.npy')))
+    if not shards:
+        return np.zeros((0, 0))
+
+    return np.concatenate([np.load(shard) for shard in shards])
+
+if __name__ == '__main__':
+    # Export a record as csv, e.g. python Records.py record_Super_existing_2_True
+    import sys
+    name = sys.argv[1] if len(sys.argv) > 1 else 'record_Super_existing_2_True'
+    np.savetxt('Results/{}.csv'.format(name), Read(name), delimiter=',')
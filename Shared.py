@@ -0,0 +1,59 @@
+# Input time series shared between the optimisation processes through shared memory
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+from multiprocessing import shared_memory
+import numpy as np
+import atexit
+import json
+import os
+
+blocks = {} # Shared memory blocks held open by this process
+
+def Publish(tag, **arrays):
+    """Shared.Publish('existing_2', MLoad=MLoad, ...): copy arrays into shared memory for child processes"""
+
+    index = {}
+    for name, array in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        blocks[name] = shm
+        index[name] = (shm.name, array.shape, array.dtype.str)
+
+    # Child processes inherit the environment, whether forked or spawned
+    os.environ['FIRM_SHARED'] = json.dumps({'tag': tag, 'blocks': index})
+    atexit.register(Release)
+
+    return index
+
+def Attach(tag):
+    """Zero-copy views of the arrays published by the parent process for this tag, or {} if there are none"""
+
+    published = json.loads(os.environ.get('FIRM_SHARED', '{}'))
+    if published.get('tag') != tag:
+        return {}
+
+    arrays = {}
+    for name, (block, shape, dtype) in published['blocks'].items():
+        try:
+            shm = shared_memory.SharedMemory(name=block, track=False) # Python 3.13+: leave unlinking to the parent
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=block)
+        except FileNotFoundError:
+            return {}
+        blocks[name] = shm
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        arrays[name].flags.writeable = False
+
+    return arrays
+
+def Release():
+    """Unlink the blocks published by this process"""
+
+    published = json.loads(os.environ.pop('FIRM_SHARED', '{}'))
+    for name, (block, shape, dtype) in published.get('blocks', {}).items():
+        shm = blocks.pop(name, None)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -4,30 +4,38 @@
 # Correspondence: bin.lu@anu.edu.au
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import os
 
-def Reliability(solution, baseload, india_imports, daily_peaking, peaking_hours, start=None, end=None):
-    """Deficit = Simulation.Reliability(S, hydro=...)"""
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def Simulate(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, bound):
+    """Interval-by-interval PHES and peaking hydro dispatch: the inner loop of Simulation.Reliability.
+    Stops once the accumulated deficit exceeds bound (MWh) and returns the number of intervals simulated"""
 
-    ###### CALCULATE NETLOAD FOR EACH INTERVAL ######
-    Netload = (solution.MLoad.sum(axis=1) - solution.GPV.sum(axis=1) - baseload.sum(axis=1))[start:end] \
-                - india_imports # Sj-ENLoad(j, t), MW
     length = len(Netload)
-    
-    solution.india_imports = india_imports # MW
 
-    ###### CREATE STORAGE SYSTEM VARIABLES ######
-    Pcapacity_PH = sum(solution.CPHP) * pow(10, 3) # S-CPHP(j), GW to MW
-    Scapacity_PH = solution.CPHS * pow(10, 3) # S-CPHS(j), GWh to MWh
-    Pcapacity_Peaking = sum(solution.CHydro_Peaking) * pow(10, 3)
-    Scapacity_Peaking = peaking_hours*Pcapacity_Peaking
-    efficiencyPH, resolution = (solution.efficiencyPH, solution.resolution)
+    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking = (np.zeros(length), np.zeros(length), np.zeros(length), np.zeros(length), np.zeros(length))
+    Deficit_energy, Deficit_power = (np.zeros(length), np.zeros(length))
 
-    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking = map(np.zeros, [length] * 5)
-    Deficit_energy, Deficit_power = map(np.zeros, [length] * 2)
-    
-    daily_peaking_divided = daily_peaking.sum(axis=1) / 24
+    simulated = Advance(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution,
+                        DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, 0, length, bound)
 
-    for t in range(length):
+    return DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated
+
+def Advance(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution,
+            DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, start, changed, bound):
+    """Simulation.Simulate in place from interval start, resuming from the storage levels at start - 1.
+    Netload is unchanged from interval changed on, so the loop stops once the storage levels rejoin the previous
+    trajectory there. Returns the end of the intervals (re)simulated"""
+
+    length = len(Netload)
+    deficit = 0.
+
+    for t in range(start, length):
         ###### INITIALISE INTERVAL ######
         Netloadt = Netload[t]
         Storage_PH_t1 = StoragePH[t-1] if t>0 else 0.5 * Scapacity_PH
@@ -38,25 +46,28 @@ def Reliability(solution, baseload, india_imports, daily_peaking, peaking_hours,
         if Scapacity_Peaking < Storage_Peaking_t1:
             Discharge_Peaking_t = daily_peaking_divided[t]
         else:
-            Discharge_Peaking_t = np.minimum(np.maximum(0, Netloadt), Pcapacity_Peaking)
-            Discharge_Peaking_t = np.minimum(Discharge_Peaking_t, Storage_Peaking_t1/resolution)
+            Discharge_Peaking_t = min(max(0., Netloadt), Pcapacity_Peaking)
+            Discharge_Peaking_t = min(Discharge_Peaking_t, Storage_Peaking_t1/resolution)
         Storage_Peaking_t = Storage_Peaking_t1 - Discharge_Peaking_t * resolution
 
-        DischargePeaking[t] = Discharge_Peaking_t
-        StoragePeaking[t] = Storage_Peaking_t
-
         ##### UPDATE STORAGE SYSTEMS ######
         Netloadt = Netloadt - Discharge_Peaking_t
-        Discharge_PH_t = min(max(0, Netloadt), Pcapacity_PH, Storage_PH_t1 / resolution)
-        Charge_PH_t = min(-1 * min(0, Netloadt), Pcapacity_PH, (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
+        Discharge_PH_t = min(max(0., Netloadt), Pcapacity_PH, Storage_PH_t1 / resolution)
+        Charge_PH_t = min(max(0., -1 * Netloadt), Pcapacity_PH, (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
         Storage_PH_t = Storage_PH_t1 - Discharge_PH_t * resolution + Charge_PH_t * resolution * efficiencyPH
 
+        # From here on, the same storage levels give the same trajectory as before
+        rejoined = t >= changed and Storage_PH_t == StoragePH[t] and Storage_Peaking_t == StoragePeaking[t]
+
+        DischargePeaking[t] = Discharge_Peaking_t
+        StoragePeaking[t] = Storage_Peaking_t
+
         DischargePH[t] = Discharge_PH_t
         ChargePH[t] = Charge_PH_t
         StoragePH[t] = Storage_PH_t
 
         diff1 = Netloadt - Discharge_PH_t + Charge_PH_t
-        
+
         ###### DETERMINE DEFICITS ######
         if diff1 <= 0:
             Deficit_energy[t] = 0
@@ -66,11 +77,156 @@ def Reliability(solution, baseload, india_imports, daily_peaking, peaking_hours,
             Deficit_power[t] = diff1
         elif (Discharge_PH_t == Storage_PH_t1 / resolution):
             Deficit_energy[t] = diff1
-            Deficit_power[t] = 0    
+            Deficit_power[t] = 0
+        else:
+            Deficit_energy[t] = 0
+            Deficit_power[t] = 0
+
+        deficit += (Deficit_energy[t] + Deficit_power[t]) * resolution
+        if deficit > bound or rejoined:
+            return t + 1
+
+    return length
+
+def SimulateBatch(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, bound):
+    """Simulation.Simulate with the population as a vector lane: Netload(p, t), Pcapacity_PH(p), Scapacity_PH(p).
+    Lanes keep running until every candidate has exceeded the bound"""
+
+    npop, length = Netload.shape
+    deficit, simulated = (np.zeros(npop), np.full(npop, length))
+
+    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking = map(np.zeros, [(npop, length)] * 5)
+    Deficit_energy, Deficit_power = map(np.zeros, [(npop, length)] * 2)
+
+    for t in range(length):
+        ###### INITIALISE INTERVAL ######
+        Netloadt = Netload[:, t]
+        Storage_PH_t1 = StoragePH[:, t-1] if t>0 else 0.5 * Scapacity_PH
+
+        Storage_Peaking_t1 = StoragePeaking[:, t-1] + daily_peaking_divided[t] if t>0 else np.full(npop, 0.5*Scapacity_Peaking)
+
+        # Calculate peaking discharge
+        Discharge_Peaking_t = np.minimum(np.minimum(np.maximum(0., Netloadt), Pcapacity_Peaking), Storage_Peaking_t1/resolution)
+        Discharge_Peaking_t = np.where(Scapacity_Peaking < Storage_Peaking_t1, daily_peaking_divided[t], Discharge_Peaking_t)
+        Storage_Peaking_t = Storage_Peaking_t1 - Discharge_Peaking_t * resolution
+
+        DischargePeaking[:, t] = Discharge_Peaking_t
+        StoragePeaking[:, t] = Storage_Peaking_t
+
+        ##### UPDATE STORAGE SYSTEMS ######
+        Netloadt = Netloadt - Discharge_Peaking_t
+        Discharge_PH_t = np.minimum(np.minimum(np.maximum(0., Netloadt), Pcapacity_PH), Storage_PH_t1 / resolution)
+        Charge_PH_t = np.minimum(np.minimum(np.maximum(0., -1 * Netloadt), Pcapacity_PH), (Scapacity_PH - Storage_PH_t1) / efficiencyPH / resolution)
+        Storage_PH_t = Storage_PH_t1 - Discharge_PH_t * resolution + Charge_PH_t * resolution * efficiencyPH
+
+        DischargePH[:, t] = Discharge_PH_t
+        ChargePH[:, t] = Charge_PH_t
+        StoragePH[:, t] = Storage_PH_t
+
+        diff1 = Netloadt - Discharge_PH_t + Charge_PH_t
+
+        ###### DETERMINE DEFICITS ######
+        power = (diff1 > 0) & (Discharge_PH_t == Pcapacity_PH)
+        energy = (diff1 > 0) & ~power & (Discharge_PH_t == Storage_PH_t1 / resolution)
+        Deficit_energy[:, t] = np.where(energy, diff1, 0)
+        Deficit_power[:, t] = np.where(power, diff1, 0)
+
+        deficit += (Deficit_energy[:, t] + Deficit_power[:, t]) * resolution
+        simulated = np.where((deficit > bound) & (simulated == length), t + 1, simulated)
+        if (simulated < length).all():
+            break
+
+    return DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated
+
+def SimulateEach(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, bound):
+    """Simulation.SimulateBatch as one compiled Simulation.Kernel call per candidate"""
+
+    npop, length = Netload.shape
+    simulated = np.zeros(npop, dtype=np.int64)
+
+    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking = (np.zeros((npop, length)), np.zeros((npop, length)), np.zeros((npop, length)), np.zeros((npop, length)), np.zeros((npop, length)))
+    Deficit_energy, Deficit_power = (np.zeros((npop, length)), np.zeros((npop, length)))
+
+    for p in range(npop):
+        DischargePH[p], ChargePH[p], StoragePH[p], DischargePeaking[p], StoragePeaking[p], Deficit_energy[p], Deficit_power[p], simulated[p] = \
+            Kernel(Netload[p], daily_peaking_divided, Pcapacity_PH[p], Scapacity_PH[p], Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, bound)
+
+    return DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated
+
+# Compiled kernels if Numba is installed; otherwise fall back to the pure-Python loop and the population-vectorised loop above
+if njit is not None:
+    Advance = njit(nogil=True, cache=True)(Advance)
+Kernel = njit(nogil=True, cache=True)(Simulate) if njit is not None else Simulate
+KernelBatch = njit(nogil=True, cache=True)(SimulateEach) if njit is not None else SimulateBatch
+
+def SimulateBlocks(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, blocks):
+    """Simulation.Kernel without a bound, in parallel in time: the blocks are simulated concurrently from guessed storage levels,
+    then each is corrected in turn from the final levels of the block before, until it rejoins its guessed trajectory"""
+
+    length = len(Netload)
+    edges = np.linspace(0, length, min(blocks, length) + 1).astype(int)
+
+    # Block k holds the storage levels at edges[k] - 1 in its first interval: a guess, as at the start of the horizon
+    arrays = []
+    for k in range(len(edges) - 1):
+        first = max(edges[k] - 1, 0)
+        block = [np.zeros(edges[k + 1] - first) for _ in range(7)] # DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power
+        block[2][0], block[4][0] = (0.5 * Scapacity_PH, 0.5 * Scapacity_Peaking)
+        arrays.append((first, block))
+
+    def Run(first, block, start, changed):
+        return Advance(Netload[first:first + len(block[0])], daily_peaking_divided[first:first + len(block[0])], Pcapacity_PH, Scapacity_PH,
+                       Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution, *block, start, changed, np.inf)
+
+    # The compiled kernel releases the GIL, so the blocks run on separate cores
+    with ThreadPoolExecutor(max_workers=min(len(arrays), os.cpu_count() or 1)) as executor:
+        list(executor.map(lambda a: Run(a[0], a[1], 0 if a[0] == 0 else 1, len(a[1][0])), arrays))
+
+    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power = [np.zeros(length) for _ in range(7)]
+    for first, block in arrays:
+        if first > 0 and (block[2][0], block[4][0]) != (StoragePH[first], StoragePeaking[first]):
+            # Boundary correction: only the initial levels changed
+            block[2][0], block[4][0] = (StoragePH[first], StoragePeaking[first])
+            Run(first, block, 1, 1)
+
+        skip = 1 if first > 0 else 0
+        for array, values in zip((DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power), block):
+            array[first + skip:first + len(values)] = values[skip:]
+
+    return DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, length
+
+def Reliability(solution, baseload, india_imports, daily_peaking, peaking_hours, start=None, end=None, bound=None, blocks=None):
+    """Deficit = Simulation.Reliability(S, hydro=...); with bound (MWh), stops early once the deficit exceeds it.
+    With blocks (e.g. years) and no bound, simulates in parallel in time (Simulation.SimulateBlocks), with the same results"""
+
+    ###### CALCULATE NETLOAD FOR EACH INTERVAL ######
+    Netbase = solution.Netbase if baseload is solution.baseload else solution.MLoad.sum(axis=1) - baseload.sum(axis=1)
+    Netbase = (Netbase - solution.GPVsum)[start:end]
+    Netload = Netbase - india_imports # Sj-ENLoad(j, t), MW
+    
+    solution.india_imports = india_imports # MW
+
+    ###### CREATE STORAGE SYSTEM VARIABLES ######
+    Pcapacity_PH = sum(solution.CPHP) * pow(10, 3) # S-CPHP(j), GW to MW
+    Scapacity_PH = solution.CPHS * pow(10, 3) # S-CPHS(j), GWh to MWh
+    Pcapacity_Peaking = sum(solution.CHydro_Peaking) * pow(10, 3)
+    Scapacity_Peaking = peaking_hours*Pcapacity_Peaking
+    efficiencyPH, resolution = (solution.efficiencyPH, solution.resolution)
+
+    daily_peaking_divided = (daily_peaking.sum(axis=1) / 24)[start:end]
+
+    if blocks and bound is None:
+        DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated = \
+            SimulateBlocks(np.ascontiguousarray(Netload, dtype=np.float64), np.ascontiguousarray(daily_peaking_divided, dtype=np.float64),
+                           float(Pcapacity_PH), float(Scapacity_PH), float(Pcapacity_Peaking), float(Scapacity_Peaking), float(efficiencyPH), float(resolution), blocks)
+    else:
+        DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated = \
+            Kernel(np.ascontiguousarray(Netload, dtype=np.float64), np.ascontiguousarray(daily_peaking_divided, dtype=np.float64),
+                   float(Pcapacity_PH), float(Scapacity_PH), float(Pcapacity_Peaking), float(Scapacity_Peaking), float(efficiencyPH), float(resolution),
+                   np.inf if bound is None else float(bound))
 
     Deficit = Deficit_energy + Deficit_power
-    Netload = Netload - DischargePeaking
-    Spillage = -1 * np.minimum(Netload + ChargePH - DischargePH, 0)
+    Spillage = -1 * np.minimum(Netload - DischargePeaking + ChargePH - DischargePH, 0)
 
     ###### ERROR CHECKING ######
     assert 0 <= int(np.amax(StoragePH)) <= Scapacity_PH, 'Storage below zero or exceeds max storage capacity'
@@ -80,23 +236,94 @@ def Reliability(solution, baseload, india_imports, daily_peaking, peaking_hours,
     ###### UPDATE SOLUTION OBJECT ######
     solution.DischargePH, solution.ChargePH, solution.StoragePH, solution.DischargePeaking, solution.StoragePeaking = (DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking)
     solution.Deficit_energy, solution.Deficit_power, solution.Deficit, solution.Spillage = (Deficit_energy, Deficit_power, Deficit, Spillage)
+    solution.simulated = simulated # Intervals simulated before reaching the deficit bound
+
+    # What Simulation.Resume needs to continue from any interval of this window
+    solution.Netload = Netload
+    solution.restart = (Netbase, np.ascontiguousarray(daily_peaking_divided, dtype=np.float64),
+                        float(Pcapacity_PH), float(Scapacity_PH), float(Pcapacity_Peaking), float(Scapacity_Peaking), float(efficiencyPH), float(resolution))
+
+    return Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage
+
+def Resume(solution, india_imports, start, changed):
+    """Simulation.Reliability after india_imports changed in [start, changed) only, e.g. Resume(S, flexible, i, i + 1):
+    re-simulates the solution in place from start until its storage levels rejoin the previous trajectory"""
+
+    Netbase, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution = solution.restart
+    Netload = solution.Netload
+    Netload[start:changed] = Netbase[start:changed] - india_imports[start:changed]
+    solution.india_imports = india_imports # MW
+
+    end = Advance(Netload, daily_peaking_divided, Pcapacity_PH, Scapacity_PH, Pcapacity_Peaking, Scapacity_Peaking, efficiencyPH, resolution,
+                  solution.DischargePH, solution.ChargePH, solution.StoragePH, solution.DischargePeaking, solution.StoragePeaking,
+                  solution.Deficit_energy, solution.Deficit_power, start, changed, np.inf)
+
+    window = slice(start, end)
+    solution.Deficit[window] = solution.Deficit_energy[window] + solution.Deficit_power[window]
+    solution.Spillage[window] = -1 * np.minimum(Netload[window] - solution.DischargePeaking[window] + solution.ChargePH[window] - solution.DischargePH[window], 0)
+
+    return end
+
+def ReliabilityBatch(solutions, baseload, india_imports, daily_peaking, peaking_hours, start=None, end=None, bound=None):
+    """Deficit = Simulation.ReliabilityBatch([S1, S2, ...], ...): Simulation.Reliability for a population, india_imports(t) or (p, t)"""
+
+    ###### CALCULATE NETLOAD FOR EACH INTERVAL ######
+    S = solutions[0]
+    Netbase = S.Netbase if baseload is S.baseload else S.MLoad.sum(axis=1) - baseload.sum(axis=1)
+    Netload = np.array([(Netbase - S.GPVsum)[start:end] for S in solutions]) - india_imports # Sj-ENLoad(p, t), MW
+    india_imports = np.broadcast_to(india_imports, Netload.shape)
+
+    ###### CREATE STORAGE SYSTEM VARIABLES ######
+    Pcapacity_PH = np.array([sum(S.CPHP) for S in solutions]) * pow(10, 3) # S-CPHP(p), GW to MW
+    Scapacity_PH = np.array([S.CPHS for S in solutions]) * pow(10, 3) # S-CPHS(p), GWh to MWh
+    Pcapacity_Peaking = sum(solutions[0].CHydro_Peaking) * pow(10, 3)
+    Scapacity_Peaking = peaking_hours*Pcapacity_Peaking
+    efficiencyPH, resolution = (solutions[0].efficiencyPH, solutions[0].resolution)
+
+    daily_peaking_divided = (daily_peaking.sum(axis=1) / 24)[start:end]
+
+    DischargePH, ChargePH, StoragePH, DischargePeaking, StoragePeaking, Deficit_energy, Deficit_power, simulated = \
+        KernelBatch(np.ascontiguousarray(Netload, dtype=np.float64), np.ascontiguousarray(daily_peaking_divided, dtype=np.float64),
+                    Pcapacity_PH.astype(np.float64), Scapacity_PH.astype(np.float64), float(Pcapacity_Peaking), float(Scapacity_Peaking), float(efficiencyPH), float(resolution),
+                    np.inf if bound is None else float(bound))
+
+    Deficit = Deficit_energy + Deficit_power
+    Netload = Netload - DischargePeaking
+    Spillage = -1 * np.minimum(Netload + ChargePH - DischargePH, 0)
+
+    ###### ERROR CHECKING ######
+    assert (0 <= np.amax(StoragePH, axis=1).astype(int)).all() and (np.amax(StoragePH, axis=1).astype(int) <= Scapacity_PH).all(), 'Storage below zero or exceeds max storage capacity'
+    assert np.amin(Deficit) > -0.1, 'DeficitD below zero'
+    assert np.amin(Spillage) >= 0, 'Spillage below zero'
+
+    ###### UPDATE SOLUTION OBJECTS ######
+    for p, S in enumerate(solutions):
+        S.india_imports = india_imports[p]
+        S.DischargePH, S.ChargePH, S.StoragePH, S.DischargePeaking, S.StoragePeaking = (DischargePH[p], ChargePH[p], StoragePH[p], DischargePeaking[p], StoragePeaking[p])
+        S.Deficit_energy, S.Deficit_power, S.Deficit, S.Spillage = (Deficit_energy[p], Deficit_power[p], Deficit[p], Spillage[p])
+        S.simulated = simulated[p]
 
     return Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage
 
 if __name__ == '__main__':
-    from Input import *
+    from Input import Model, Solution
     from Network import Transmission 
 
     suffix = "_Super_existing_2_True.csv"
     Optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
+
+    data = Model('existing', 'Super', 2, True)
+    intervals, resolution, years, efficiencyPH = (data.intervals, data.resolution, data.years, data.efficiencyPH)
+    baseload, daily_peaking, peaking_hours = (data.baseload, data.daily_peaking, data.peaking_hours)
+    node, factor, energy, TLoss = (data.node, data.factor, data.energy, data.TLoss)
     
     # Initialise the optimisation
-    S = Solution(Optimisation_x)
+    S = Solution(Optimisation_x, data)
 
     CIndia = np.nan_to_num(np.array(S.CInter))
 
     # Simulation with only baseload
-    Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargePeaking1, Spillage1 = Reliability(S, baseload=baseload, india_imports=np.zeros(intervals), daily_peaking=daily_peaking)
+    Deficit_energy1, Deficit_power1, Deficit1, DischargePH1, DischargePeaking1, Spillage1 = Reliability(S, baseload=baseload, india_imports=np.zeros(intervals), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
     Max_deficit1 = np.reshape(Deficit1, (-1, 8760)).sum(axis=-1) # MWh per year
     PIndia = Deficit1.max() * pow(10, -3) # GW
 
@@ -106,7 +333,7 @@ if __name__ == '__main__':
     PenEnergy = 0
     
     # Simulation with baseload, all existing capacity
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=np.ones(intervals) * CIndia.sum() * pow(10,3), daily_peaking=daily_peaking)
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=np.ones(intervals) * CIndia.sum() * pow(10,3), daily_peaking=daily_peaking, peaking_hours=peaking_hours)
 
     # Deficit penalty function
     PenDeficit = max(0, Deficit.sum() * resolution - S.allowance)
@@ -115,7 +342,7 @@ if __name__ == '__main__':
     india_imports = np.clip(Deficit1, 0, CIndia.sum() * pow(10,3)) # MW
 
     # Simulation using the existing capacity generation profiles - required for storage average annual discharge
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking)
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=india_imports, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
 
     # Discharged energy from storage systems
     GPHES = DischargePH.sum() * resolution / years * pow(10,-6) # TWh per year
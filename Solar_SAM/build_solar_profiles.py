@@ -1,48 +1,79 @@
 import pandas as pd
+import numpy as np
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def create_profiles(lats, longs, years, input_dir, output_file):
-    # Initialize an empty DataFrame for the final output
-    final_df = pd.DataFrame()
-
-    for i in range(len(lats)):
-        latitude = lats[i]
-        longitude = longs[i]
-        combo_str = latitude + '_' + longitude
-
-        # Initialize an empty DataFrame for the current location
-        location_df = pd.DataFrame()
-
-        # Loop through each year and append the data to location_df
-        for year in years:
-            file_path = os.path.join(input_dir, f'PVWatts_{year}_{combo_str}.csv')
-            if os.path.exists(file_path):
-                temp_df = pd.read_csv(file_path)
-                location_df = location_df.append(temp_df, ignore_index=True)
-            else:
-                print(f"File {file_path} does not exist.")
-
-        # Normalize the 'ac' values by dividing by 4000
-        if 'ac' in location_df.columns:
-            location_df['ac'] = location_df['ac'] / 4000
-        else:
-            print(f"'ac' column not found in {combo_str} data.")
-            continue
-
-        # Add this location's data as a new column in the final DataFrame
-        final_df[combo_str] = location_df['ac']
-
-    # Write the resulting DataFrame to a new CSV file
-    final_df.to_csv(output_file, index=False)
+HOURS = 8760  # PVWatts output per year (no 29 February)
+CAPACITY = 4000  # W, system_capacity of pvwatts_sdk.py
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_INPUT = os.path.join(ROOT, 'Data', 'pv.csv')
+
+def model_zones():
+    # PVl of Input.py: Input.py reads one column of Data/pv.csv per zone (usecols=range(4, 4+len(PVl)))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from Input import PVl
+    return PVl
+
+def check_output(output_file, sites):
+    # Never replace the model's input with a file it cannot load
+    if os.path.abspath(output_file) == MODEL_INPUT and sites != len(model_zones()):
+        raise ValueError(f"{sites} sites, but Input.py reads {len(model_zones())} PV zones from {MODEL_INPUT}. "
+                         "Map the sites to the zones of PVl, or write the profiles elsewhere.")
+
+def read_site(input_dir, combo_str, years):
+    # Normalised output of one site for all years, each PVWatts file read once
+    profile = np.empty(len(years) * HOURS)
+    for y, year in enumerate(years):
+        file_path = os.path.join(input_dir, f'PVWatts_{year}_{combo_str}.csv')
+        ac = pd.read_csv(file_path, usecols=['ac'], engine='c')['ac'].to_numpy(dtype=float)
+        if len(ac) != HOURS:
+            raise ValueError(f"{file_path} has {len(ac)} rows, expected {HOURS}.")
+        profile[y * HOURS:(y + 1) * HOURS] = ac / CAPACITY
+    return profile
+
+def calendar(years):
+    # Year, Month, Day, Interval columns of Data/pv.csv, in the 365-day calendar of the PVWatts output
+    hours = np.arange(len(years) * HOURS)
+    days = np.datetime64('2013-01-01') + (hours // 24) % 365  # A non-leap year
+    months = days.astype('datetime64[M]')
+    return np.column_stack([np.array(years)[hours // HOURS], months.astype(np.int64) % 12 + 1, (days - months).astype(np.int64) + 1, hours % 24 + 1])
+
+def create_profiles(lats, longs, years, input_dir, output_file, zones=None, workers=None):
+    combos = [lat + '_' + lon for lat, lon in zip(lats, longs)]
+    check_output(output_file, len(combos))
+
+    # Every file must be there: a missing year would shift all later hours of the site
+    missing = [os.path.join(input_dir, f'PVWatts_{year}_{combo_str}.csv') for combo_str in combos for year in years
+               if not os.path.exists(os.path.join(input_dir, f'PVWatts_{year}_{combo_str}.csv'))]
+    if missing:
+        raise FileNotFoundError("Missing PVWatts output:\n" + '\n'.join(missing))
+
+    # Sites in parallel, each written into its column of the preallocated profile
+    profiles = np.empty((len(years) * HOURS, len(combos)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for i, profile in enumerate(executor.map(read_site, [input_dir] * len(combos), combos, [years] * len(combos))):
+            profiles[:, i] = profile
+
+    # Data/pv.csv layout read by Input.py: four calendar columns, then one column per site (usecols=range(4, 4+len(PVl)))
+    header = ','.join(['Year', 'Month', 'Day', 'Interval'] + (list(zones) if zones is not None else combos))
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    np.savetxt(output_file, np.hstack([calendar(years), profiles]), fmt='%.6g', delimiter=',', header=header, comments='')
+
+    # Binary twin: the profiles without the calendar, TSPV(t, i)
+    np.save(os.path.splitext(output_file)[0] + '.npy', profiles)
     print(f"Output written to {output_file}")
 
+    return profiles
+
 if __name__ == '__main__':
-    input_dir = '/Users/geetabhatta/Documents/Firm_ModelNepal_Electricity/Solar_SAM/SAM_Output'
-    output_dir = '/Users/geetabhatta/Documents/Firm_ModelNepal_Electricity/Solar_SAM/PV_Output'
-    output_file = os.path.join(output_dir, 'pv_combined_profile.csv')
+    input_dir = os.path.join(ROOT, 'Solar_SAM', 'SAM_Output')
+    output_file = os.path.join(ROOT, 'Solar_SAM', 'pv.csv')  # Not Data/pv.csv: these 19 sites are not yet mapped to the 23 zones of PVl
 
     lats = [str(x) for x in [26.7908, 26.9784, 27.087, 27.3141, 27.3141, 27.7179, 26.9138, 26.9435, 26.5663, 27.5409, 27.9373, 27.7551, 27.8507, 28.3565, 27.5328, 28.4229, 28.4782, 28.855, 28.9754]]
     longs = [str(x) for x in [87.6376, 87.0945, 86.7587, 87.6968, 87.1537, 87.3067, 85.7204, 85.214, 86.6735, 85.671, 85.1109, 86.1999, 84.1951, 84.628, 83.1894, 82.7561, 82.1175, 82.2588, 80.6335]]
-    years = list(range(2013, 2022))  # From 2013 to 2021 inclusive
+    years = list(range(2013, 2023))  # 2013 to 2022 inclusive, the simulation period of Input.py
 
     create_profiles(lats, longs, years, input_dir, output_file)
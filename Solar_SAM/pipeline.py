@@ -0,0 +1,147 @@
+import ast
+import hashlib
+import json
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+from solcast_to_nrel import FILE_INFO, YEARS, convert_nrel
+from build_solar_profiles import check_output, create_profiles
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Solcast/<file> -> NREL_Output/NREL_{year}_{site}.csv -> SAM_Output/PVWatts_{year}_{site}.csv -> pv.csv
+SOLCAST_DIR = os.path.join(ROOT, 'Solcast')
+NREL_DIR = os.path.join(ROOT, 'NREL_Output')
+SAM_DIR = os.path.join(ROOT, 'SAM_Output')
+MANIFEST = os.path.join(ROOT, '.pipeline.json')
+
+def file_digest(path, manifest):
+    # Content hash of a file, reused while its mtime and size are unchanged
+    status = os.stat(path)
+    cached = manifest['files'].get(path)
+    if cached is not None and cached[:2] == [status.st_mtime_ns, status.st_size]:
+        return cached[2]
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    manifest['files'][path] = [status.st_mtime_ns, status.st_size, digest.hexdigest()]
+    return digest.hexdigest()
+
+def task_key(task, manifest):
+    # Hash of a task's parameters and the content of its inputs
+    digest = hashlib.sha1(json.dumps(task['params'], sort_keys=True).encode())
+    for path in task['inputs']:
+        digest.update(file_digest(path, manifest).encode())
+    return digest.hexdigest()
+
+def is_stale(task, key, manifest):
+    # A task is rebuilt if its inputs or parameters changed, or an output is missing or was changed since it was built
+    built = manifest['tasks'].get(task['name'])
+    if built is None or built['key'] != key:
+        return True
+    return any(not os.path.exists(path) or file_digest(path, manifest) != built['outputs'].get(path) for path in task['outputs'])
+
+def convert_task(task):
+    input_csv, latitude, longitude, elevation = task['params']
+    os.makedirs(NREL_DIR, exist_ok=True)
+    convert_nrel(input_csv, latitude, longitude, elevation, NREL_DIR)
+    return task['name']
+
+def pvwatts_task(task):
+    from pvwatts_sdk import read_weather_header, run_pvwatts_simulation  # PySAM is only needed when a simulation is stale
+    nrel_file, output_file = (task['inputs'][0], task['outputs'][0])
+    os.makedirs(SAM_DIR, exist_ok=True)
+    latitude, longitude, elevation = read_weather_header(nrel_file)
+    if not run_pvwatts_simulation(nrel_file, output_file, latitude, longitude, elevation):
+        raise RuntimeError(f"PVWatts simulation failed for {nrel_file}")
+    return task['name']
+
+def profiles_task(task):
+    lats, longs, years, output_file = task['params']
+    create_profiles(lats, longs, years, SAM_DIR, output_file)
+    return task['name']
+
+def plan(output_file):
+    # The stages of the solar chain, each a list of tasks that only depend on the stages before
+    check_output(output_file, len(FILE_INFO))  # Before any work, rather than after the simulations
+    convert, pvwatts, design = ([], [], pvwatts_design())
+    for file_name, latitude, longitude, elevation in FILE_INFO:
+        combo_str = f'{latitude}_{longitude}'
+        nrel_files = [os.path.join(NREL_DIR, f'NREL_{year}_{combo_str}.csv') for year in YEARS]
+        convert.append({'name': f'convert {combo_str}', 'run': convert_task, 'inputs': [os.path.join(SOLCAST_DIR, file_name)],
+                        'outputs': nrel_files, 'params': [os.path.join(SOLCAST_DIR, file_name), latitude, longitude, elevation]})
+        for year, nrel_file in zip(YEARS, nrel_files):
+            pvwatts.append({'name': f'pvwatts {year} {combo_str}', 'run': pvwatts_task, 'inputs': [nrel_file],
+                            'outputs': [os.path.join(SAM_DIR, f'PVWatts_{year}_{combo_str}.csv')], 'params': design})
+
+    lats, longs = ([str(info[1]) for info in FILE_INFO], [str(info[2]) for info in FILE_INFO])
+    profiles = [{'name': 'profiles', 'run': profiles_task, 'inputs': [task['outputs'][0] for task in pvwatts],
+                 'outputs': [output_file, os.path.splitext(output_file)[0] + '.npy'], 'params': [lats, longs, list(YEARS), output_file]}]
+
+    return [convert, pvwatts, profiles]
+
+def pvwatts_design():
+    # SYSTEM_DESIGN of pvwatts_sdk.py, read without importing PySAM
+    with open(os.path.join(ROOT, 'pvwatts_sdk.py'), 'r') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'SYSTEM_DESIGN' for target in node.targets):
+            return ast.literal_eval(node.value)
+
+def run(stages, workers=None, force=False, dry_run=False):
+    # Run the stale tasks of each stage concurrently; an error in a task leaves it stale for the next run
+    manifest = {'files': {}, 'tasks': {}}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, 'r') as f:
+            manifest = json.load(f)
+
+    failed = 0
+    for stage in stages:
+        stale = []
+        for task in stage:
+            if not all(os.path.exists(path) for path in task['inputs']):
+                print(f"Skipping {task['name']}: missing inputs")
+                continue
+            key = task_key(task, manifest)
+            if force or is_stale(task, key, manifest):
+                stale.append((task, key))
+
+        print(f"{len(stale)} of {len(stage)} tasks to run" + ''.join(f"\n  {task['name']}" for task, key in stale))
+        if dry_run or not stale:
+            continue
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(task, key, executor.submit(task['run'], {k: v for k, v in task.items() if k != 'run'})) for task, key in stale]
+            for task, key, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error in {task['name']}: {e}")
+                    manifest['tasks'].pop(task['name'], None)
+                    failed += 1
+                    continue
+                manifest['tasks'][task['name']] = {'key': key, 'outputs': {path: file_digest(path, manifest) for path in task['outputs'] if os.path.exists(path)}}
+
+        # Saved after every stage, so that an interrupted run keeps the finished work
+        with open(MANIFEST + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(MANIFEST + '.tmp', MANIFEST)
+
+    return failed
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Incremental build of the solar profiles (Data/pv.csv layout) from the Solcast downloads')
+    parser.add_argument('-j', default=None, type=int, required=False, help='worker processes, default all cores')
+    parser.add_argument('-o', default=os.path.join(ROOT, 'pv.csv'), type=str, required=False, help='output profiles; Data/pv.csv only once there is a site for each PV zone of Input.py')
+    parser.add_argument('-n', action='store_true', help='dry run: list the stale tasks of each stage (later stages assume the earlier ones unchanged)')
+    parser.add_argument('--force', action='store_true', help='rebuild everything')
+    args = parser.parse_args()
+
+    try:
+        stages = plan(os.path.abspath(args.o))
+    except ValueError as e:
+        parser.error(str(e))
+    raise SystemExit(1 if run(stages, args.j, args.force, args.n) else 0)
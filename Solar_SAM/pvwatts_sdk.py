@@ -1,32 +1,40 @@
 import PySAM
 import PySAM.Pvwattsv8 as pvwatts
 import pandas as pd
+import hashlib
+import json
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
 
-def preprocess_weather_file(input_file, output_file):
-    # Read the file skipping the first two rows
-    df = pd.read_csv(input_file, skiprows=2)
-    
-    # Read latitude, longitude, and elevation from the second row
+REQUIRED_COLUMNS = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'DNI', 'DHI', 'GHI', 'Temperature', 'Relative Humidity', 'Wind Direction', 'Wind Speed']
+
+SYSTEM_DESIGN = {
+    'system_capacity': 4,
+    'dc_ac_ratio': 1.15,
+    'tilt': 20,
+    'azimuth': 180,
+    'inv_eff': 96,
+    'losses': 14.08,
+    'module_type': 1,  # Standard
+    'array_type': 1,
+    'gcr': 0.3,
+}
+
+def read_weather_header(input_file):
+    # Latitude, longitude and elevation from the metadata rows, reading only the three header lines; the file is not modified
     with open(input_file, 'r') as f:
-        lines = f.readlines()
-        second_row = lines[1].strip().split(',')
-        latitude = float(second_row[5])  # Assuming latitude is at index 5
-        longitude = float(second_row[6])  # Assuming longitude is at index 6
-        elevation = float(second_row[8])  # Assuming elevation is at index 8
-    
-    # Ensure all required columns are present
-    required_columns = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'DNI', 'DHI', 'GHI', 'Temperature', 'Relative Humidity', 'Wind Direction', 'Wind Speed']
-    
-    # Check and handle case sensitivity or additional spaces
-    missing_columns = [col for col in required_columns if col not in df.columns]
+        f.readline()
+        second_row = f.readline().strip().split(',')
+        columns = f.readline().strip().split(',')
+
+    latitude = float(second_row[5])  # Latitude is at index 5
+    longitude = float(second_row[6])  # Longitude is at index 6
+    elevation = float(second_row[8])  # Elevation is at index 8
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
     if missing_columns:
         raise ValueError(f"The file {input_file} is missing columns: {', '.join(missing_columns)}")
-    
-    # Save the cleaned file
-    df.to_csv(output_file, index=False)
-    
+
     return latitude, longitude, elevation
 
 def run_pvwatts_simulation(solar_resource_file, output_file, latitude, longitude, elevation):
@@ -37,57 +45,88 @@ def run_pvwatts_simulation(solar_resource_file, output_file, latitude, longitude
     model.SolarResource.lon = longitude
     model.SolarResource.elev = elevation  # Set elevation
 
-    model.SystemDesign.system_capacity = 4
-    model.SystemDesign.dc_ac_ratio = 1.15
-    model.SystemDesign.tilt = 20
-    model.SystemDesign.azimuth = 180
-    model.SystemDesign.inv_eff = 96
+    for name, value in SYSTEM_DESIGN.items():
+        setattr(model.SystemDesign, name, value)
     model.Lifetime.system_use_lifetime_output = 0
-    model.SystemDesign.losses = 14.08
-    model.SystemDesign.module_type = 1  # Standard
-    model.SystemDesign.array_type = 1
-    model.SystemDesign.gcr = 0.3
 
     try:
         model.execute()
     except Exception as e:
         print(f"Exception: {e}")
-        return
+        return False
 
+    # Written under a temporary name, so that an interrupted run never leaves a partial output behind
     ac = model.Outputs.ac
-    pd.DataFrame(ac, columns=['ac']).to_csv(output_file, index=False)
+    pd.DataFrame(ac, columns=['ac']).to_csv(output_file + '.tmp', index=False)
+    os.replace(output_file + '.tmp', output_file)
+    return True
 
-if __name__ == '__main__':
-    input_dir = '/Users/geetabhatta/Documents/Firm_ModelNepal_Electricity/Solar_SAM/NREL_Output'
-    output_dir = '/Users/geetabhatta/Documents/Firm_ModelNepal_Electricity/Solar_SAM/SAM_Output'
-    
-    lats = [str(x) for x in [26.7908, 26.9784, 27.087, 27.3141, 27.3141, 27.7179, 26.9138, 26.9435, 26.5663, 27.5409, 27.9373, 27.7551, 27.8507, 28.3565, 27.5328, 28.4229, 28.4782, 28.855, 28.9754]]
-    longs = [str(x) for x in [87.6376, 87.0945, 86.7587, 87.6968, 87.1537, 87.3067, 85.7204, 85.214, 86.6735, 85.671, 85.1109, 86.1999, 84.1951, 84.628, 83.1894, 82.7561, 82.1175, 82.2588, 80.6335]]
-    years = list(range(2013, 2023))  # Adjusted to include up to 2022
+def simulate_site_year(task):
+    # One site-year in a worker process: (output file, manifest entry) or (output file, None) on failure
+    nrel_file, output_file, entry = task
+    try:
+        latitude, longitude, elevation = read_weather_header(nrel_file)
+    except Exception as e:
+        print(f"Error reading {nrel_file}: {e}")
+        return output_file, None
+
+    try:
+        done = run_pvwatts_simulation(nrel_file, output_file, latitude, longitude, elevation)
+    except Exception as e:
+        print(f"Error running PVWatts simulation for {nrel_file}: {e}")
+        return output_file, None
 
-    for i in range(len(lats)):
-        latitude = float(lats[i])
-        longitude = float(longs[i])
-        combo_str = f"{latitude}_{longitude}"
-        
+    return output_file, entry if done else None
+
+def run_batch(lats, longs, years, input_dir, output_dir, workers=None):
+    # Simulate the site-years whose input or system design changed since their output was written (see manifest.json)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_file = os.path.join(output_dir, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+
+    design = hashlib.sha1(json.dumps([getattr(PySAM, '__version__', ''), SYSTEM_DESIGN], sort_keys=True).encode()).hexdigest()
+
+    tasks = []
+    for latitude, longitude in zip(lats, longs):
+        combo_str = f"{float(latitude)}_{float(longitude)}"
         for year in years:
             nrel_file = os.path.join(input_dir, f'NREL_{year}_{combo_str}.csv')
             output_file = os.path.join(output_dir, f'PVWatts_{year}_{combo_str}.csv')
-            
-            # Preprocess weather file
-            try:
-                preprocess_weather_file(nrel_file, nrel_file)  # Overwrite the original file with preprocessed data
-            except Exception as e:
-                print(f"Error preprocessing {nrel_file}: {e}")
-                continue
-            
-            # Run PVWatts simulation
-            try:
-                elevation = None  # You need to extract elevation from the file in preprocess_weather_file function
-                run_pvwatts_simulation(nrel_file, output_file, latitude, longitude, elevation)
-            except Exception as e:
-                print(f"Error running PVWatts simulation for {nrel_file}: {e}")
+            if not os.path.exists(nrel_file):
+                print(f"File not found: {nrel_file}")
                 continue
-        
-        print(f'Simulations complete for {lats[i]}, {longs[i]}!')
 
+            status = os.stat(nrel_file)
+            entry = [status.st_mtime_ns, status.st_size, design]
+            if os.path.exists(output_file) and manifest.get(os.path.basename(output_file)) == entry:
+                continue  # Up to date
+            tasks.append((nrel_file, output_file, entry))
+
+    print(f"{len(tasks)} site-years to simulate")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for output_file, entry in executor.map(simulate_site_year, tasks):
+            if entry is None:
+                manifest.pop(os.path.basename(output_file), None)
+            else:
+                manifest[os.path.basename(output_file)] = entry
+
+    with open(manifest_file + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+    return len(tasks)
+
+if __name__ == '__main__':
+    root = os.path.dirname(os.path.abspath(__file__))
+    input_dir = os.path.join(root, 'NREL_Output')
+    output_dir = os.path.join(root, 'SAM_Output')
+
+    lats = [str(x) for x in [26.7908, 26.9784, 27.087, 27.3141, 27.3141, 27.7179, 26.9138, 26.9435, 26.5663, 27.5409, 27.9373, 27.7551, 27.8507, 28.3565, 27.5328, 28.4229, 28.4782, 28.855, 28.9754]]
+    longs = [str(x) for x in [87.6376, 87.0945, 86.7587, 87.6968, 87.1537, 87.3067, 85.7204, 85.214, 86.6735, 85.671, 85.1109, 86.1999, 84.1951, 84.628, 83.1894, 82.7561, 82.1175, 82.2588, 80.6335]]
+    years = list(range(2013, 2023))  # Adjusted to include up to 2022
+
+    run_batch(lats, longs, years, input_dir, output_dir)
+    print('Simulations complete!')
@@ -4,81 +4,134 @@
 # Licensed under the MIT Licence
 # Correspondence: bin.lu@anu.edu.au
 
-from Input import *
+from Input import Model, Solution, firstyear
 from Simulation import Reliability
 from Network import Transmission
+from Cache import genfromtxt
 
 import numpy as np
 import datetime as dt
 
-def Debug(solution):
-    """Debugging"""
-    Load, PV, India = (solution.MLoad.sum(axis=1), solution.GPV.sum(axis=1), solution.MIndia.sum(axis=1))
-    Baseload = solution.MBaseload.sum(axis=1)
-    Peaking = solution.MPeaking.sum(axis=1)
+output = ['csv'] # Formats of the load profiles and generation mix: csv (a file per node) and/or npz (a single file)
+
+def Validate(solution, tolerance=1, capacity_tolerance=0.1):
+    """Violations of the energy balance, storage continuity and capacity limits: {check: (intervals, magnitudes)}, empty if none.
+    Uses the nodal profiles of Network.Transmission(S, output=True) if available, else only needs Simulation.Reliability(S, ...)"""
+    resolution, efficiencyPH = (solution.resolution, solution.efficiencyPH)
+
+    Load, PV = (solution.MLoad.sum(axis=1), solution.GPVsum)
+    India = solution.MIndia.sum(axis=1) if hasattr(solution, 'MIndia') else solution.india_imports
+    Baseload = solution.MBaseload.sum(axis=1) if hasattr(solution, 'MBaseload') else solution.baseload.sum(axis=1)
+    Peaking = solution.MPeaking.sum(axis=1) if hasattr(solution, 'MPeaking') else solution.DischargePeaking
 
     DischargePH, ChargePH, StoragePH = (solution.DischargePH, solution.ChargePH, solution.StoragePH)
-    Deficit_energy, Deficit_power, Deficit, Spillage = (solution.Deficit_energy, solution.Deficit_power, solution.Deficit, solution.Spillage)
+    Deficit, Spillage = (solution.Deficit, solution.Spillage)
 
     PHS = solution.CPHS * pow(10, 3) # GWh to MWh
-    efficiencyPH = solution.efficiencyPH
 
-    for i in range(intervals):
-        # Energy supply-demand balance
-        assert abs(Load[i] + ChargePH[i] + Spillage[i] \
-                   - PV[i] - India[i] - Baseload[i] - Peaking[i] - DischargePH[i] - Deficit[i]) <= 1
+    # Energy supply-demand balance
+    Balance = Load + ChargePH + Spillage - PV - India - Baseload - Peaking - DischargePH - Deficit
+
+    # Discharge, Charge and Storage
+    Previous = np.concatenate(([0.5 * PHS], StoragePH[:-1]))
+    Continuity = StoragePH - Previous + DischargePH * resolution - ChargePH * resolution * efficiencyPH
 
-        # Discharge, Charge and Storage
-        if i==0:
-            assert abs(StoragePH[i] - 0.5 * PHS + DischargePH[i] * resolution - ChargePH[i] * resolution * efficiencyPH) <= 1
-        else:
-            assert abs(StoragePH[i] - StoragePH[i - 1] + DischargePH[i] * resolution - ChargePH[i] * resolution * efficiencyPH) <= 1
+    checks = {'Balance': (abs(Balance), tolerance), 'StoragePH continuity': (abs(Continuity), tolerance),
+              # Capacity: PV, India, Discharge, Charge and Storage
+              'PV': (PV - sum(solution.CPV) * pow(10, 3), capacity_tolerance),
+              'India': (India - sum(solution.CInter) * pow(10, 3), capacity_tolerance),
+              'DischargePH': (DischargePH - sum(solution.CPHP) * pow(10, 3), capacity_tolerance),
+              'ChargePH': (ChargePH - sum(solution.CPHP) * pow(10, 3), capacity_tolerance),
+              'StoragePH': (StoragePH - PHS, capacity_tolerance)}
 
-        # Capacity: PV, Discharge, Charge and Storage
-        try:
-            assert np.amax(PV) - sum(solution.CPV) * pow(10, 3) <= 0.1, print("PV",np.amax(PV) - sum(solution.CPV) * pow(10, 3))
-            assert np.amax(India) - sum(solution.CInter) * pow(10,3) <= 0.1
+    report = {}
+    for check, (excess, limit) in checks.items():
+        intervals = np.flatnonzero(excess > limit)
+        if len(intervals):
+            report[check] = (intervals, excess[intervals])
 
-            assert np.amax(DischargePH) - sum(solution.CPHP) * pow(10, 3) <= 0.1, print("DischargePH",np.amax(DischargePH) - sum(solution.CPHP) * pow(10, 3))
-            assert np.amax(ChargePH) - sum(solution.CPHP) * pow(10, 3) <= 0.1, print("ChargePH",np.amax(ChargePH) - sum(solution.CPHP) * pow(10, 3))
-            assert np.amax(StoragePH) - solution.CPHS * pow(10, 3) <= 0.1, print("StoragePH",np.amax(StoragePH) - solution.CPHS * pow(10, 3))
-        except AssertionError:
-            pass
+    return report
 
-    print('Debugging: everything is ok')
+def Debug(solution):
+    """Debugging"""
+    report = Validate(solution)
+
+    for check, (intervals, excess) in report.items():
+        print('{}: {} intervals violated, first {}, at most {} over'.format(check, len(intervals), intervals[0], excess.max()))
+
+    assert 'Balance' not in report and 'StoragePH continuity' not in report, 'Energy balance or storage continuity violated'
+    if not report:
+        print('Debugging: everything is ok')
 
     return True
 
+def Timestamps(intervals, resolution):
+    """'Tue 1 Jan 2013 00:00' of each interval from firstyear: (datetime64, strftime('%a %-d %b %Y %H:%M') fields)"""
+    time = np.datetime64('{}-01-01T00:00'.format(firstyear)) + np.arange(intervals) * np.timedelta64(int(round(60 * resolution)), 'm')
+
+    days, months, years = [time.astype('datetime64[{}]'.format(unit)) for unit in ('D', 'M', 'Y')]
+    weekdays = np.array(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])[(days.astype(np.int64) + 3) % 7] # 1 Jan 1970 was a Thursday
+    monthnames = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])[months.astype(np.int64) % 12]
+    minutes = (time - days).astype('timedelta64[m]').astype(np.int64)
+
+    fields = [weekdays, (days - months).astype(np.int64) + 1, monthnames, years.astype(np.int64) + 1970, minutes // 60, minutes % 60]
+    return time, fields
+
+def WriteCSV(fname, header, fields, C):
+    """np.savetxt(fname, np.insert(C.astype('str'), 0, datentime, axis=1), fmt='%s', ...) for rounded C(t, k), formatted in one pass"""
+    rows, columns = C.shape
+
+    if not (abs(C) < 1e16).all():
+        # str() switches to exponents (or nan, inf) here
+        datentime = ['%s %d %s %d %02d:%02d' % row for row in zip(*fields)]
+        np.savetxt(fname, np.insert(C.astype('str'), 0, datentime, axis=1), fmt='%s', delimiter=',', header=header, comments='')
+        return
+
+    # Whole floats are written as str() does, e.g. 1234.0 and -0.0
+    table = np.empty((rows, len(fields) + columns), dtype=object)
+    for k, field in enumerate(fields):
+        table[:, k] = field.tolist()
+    table[:, len(fields):] = C.astype(np.int64).tolist()
+    table[:, len(fields):][(C == 0) & np.signbit(C)] = '-0'
+
+    line = '%s %d %s %d %02d:%02d,' + ','.join(['%s.0'] * columns) + '\n'
+    with open(fname, 'w') as f:
+        f.write(header + '\n')
+        f.write((line * rows) % tuple(table.ravel().tolist()))
+
 def LPGM(solution):
     """Load profiles and generation mix data"""
+    data = solution.data
+    node, scenario, percapita, import_flag = (data.node, data.scenario, data.percapita, data.import_flag)
+    intervals, resolution, nodes = (data.intervals, data.resolution, data.nodes)
 
     Debug(solution)
 
     C = np.stack([(solution.MLoad).sum(axis=1),
-                  solution.MBaseload.sum(axis=1), solution.MPeaking.sum(axis=1), solution.MIndia.sum(axis=1), solution.GPV.sum(axis=1),
+                  solution.MBaseload.sum(axis=1), solution.MPeaking.sum(axis=1), solution.MIndia.sum(axis=1), solution.GPVsum,
                   solution.DischargePH, solution.Deficit, -1 * (solution.Spillage), -1 * solution.ChargePH,
-                  solution.StoragePH, solution.StoragePeaking,
-                  solution.SPKP, solution.KPLP, solution.LPGP, solution.GPBP, solution.BPMP, solution.EPMP, solution.TISP, solution.GILP, solution.MIMP, solution.KIEP])
-       # ['SPKP', 'KPLP', 'LPGP', 'GPBP', 'BPMP', 'EPMP', 'TISP', 'GILP', 'MIMP', 'KIEP']
+                  solution.StoragePH, solution.StoragePeaking]
+                 + list(solution.TDC.transpose())) # Data/lines.csv
 
     C = np.around(C.transpose())
 
-    datentime = np.array([(dt.datetime(firstyear, 1, 1, 0, 0) + x * dt.timedelta(minutes=60 * resolution)).strftime('%a %-d %b %Y %H:%M') for x in range(intervals)])
-    C = np.insert(C.astype('str'), 0, datentime, axis=1)
+    time, fields = Timestamps(intervals, resolution)
 
     header = 'Date & time,Operational demand,' \
              'RoR Hydropower (MW),Peaking Hydropower (MW), India Imports (MW),Solar photovoltaics (MW),PHES-Discharge (MW),Energy deficit (MW), Energy Spillage (MW), PHES-Charge (MW),' \
              'PHES-Storage (MWh),Peaking-Storage (MWh),' \
-             'SPKP, KPLP, LPGP, GPBP, BPMP, EPMP, TISP, GILP, MIMP, KIEP'
+             + ', '.join(data.Linel)
 
-    np.savetxt('Results/LPGM_{}_{}_{}_{}_Network.csv'.format(node,scenario,percapita,import_flag), C, fmt='%s', delimiter=',', header=header, comments='')
+    if 'csv' in output:
+        WriteCSV('Results/LPGM_{}_{}_{}_{}_Network.csv'.format(node,scenario,percapita,import_flag), header, fields, C)
+    results = {'time': time, 'Network': C, 'Network_header': header}
 
     if 'Super' in node:
         header = 'Date & time,Operational demand,' \
                  'RoR Hydropower (MW),Peaking Hydropower (MW), India Imports (MW),Solar photovoltaics (MW),PHES-Discharge (MW),Energy deficit (MW), Energy Spillage (MW),'\
                  'Transmission,PHES-Charge (MW),' \
                  'PHES-Storage,'
-        Topology = solution.Topology[np.where(np.in1d(Nodel, coverage) == True)[0]]
+        Topology = solution.Topology[np.where(np.isin(data.Nodel, data.coverage) == True)[0]]
 
         for j in range(nodes):
 
@@ -89,8 +142,14 @@ def LPGM(solution):
                           solution.MStoragePH[:, j]])
             C = np.around(C.transpose())
 
-            C = np.insert(C.astype('str'), 0, datentime, axis=1)
-            np.savetxt('Results/LPGM_{}_{}_{}_{}_{}.csv'.format(node,scenario,percapita, import_flag,solution.Nodel[j]), C, fmt='%s', delimiter=',', header=header, comments='')
+            if 'csv' in output:
+                WriteCSV('Results/LPGM_{}_{}_{}_{}_{}.csv'.format(node,scenario,percapita, import_flag,solution.Nodel[j]), header, fields, C)
+            results[solution.Nodel[j]] = C
+        results['Node_header'] = header
+
+    if 'npz' in output:
+        # All nodes in one file: np.load(...)['SP'] is the table of LPGM_..._SP.csv without its date & time column
+        np.savez('Results/LPGM_{}_{}_{}_{}.npz'.format(node,scenario,percapita,import_flag), **results)
 
     print('Load profiles and generation mix is produced.')
 
@@ -98,8 +157,12 @@ def LPGM(solution):
 
 def GGTA(solution):
     """GW, GWh, TWh p.a. and A$/MWh information"""
+    data = solution.data
+    node, scenario, percapita, import_flag = (data.node, data.scenario, data.percapita, data.import_flag)
+    resolution, years, MLoad, TLoss, CHydro_max = (data.resolution, data.years, data.MLoad, data.TLoss, data.CHydro_max)
+
     # Import cost factors
-    factor = np.genfromtxt('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
+    factor = genfromtxt('Data/factor_hvac.csv', dtype=None, delimiter=',', encoding=None)
         
     factor = dict(factor)
 
@@ -108,7 +171,7 @@ def GGTA(solution):
     CapHydro = CHydro_max.sum() # GW
 
     # Import generation energy [GWh] from the least-cost solution
-    GPV, GHydro, GIndia = map(lambda x: x * pow(10, -6) * resolution / years, (solution.GPV.sum(), solution.MBaseload.sum() + solution.MPeaking.sum(), solution.MIndia.sum())) # TWh p.a.
+    GPV, GHydro, GIndia = map(lambda x: x * pow(10, -6) * resolution / years, (solution.GPVsum.sum(), solution.MBaseload.sum() + solution.MPeaking.sum(), solution.MIndia.sum())) # TWh p.a.
     DischargePH = solution.DischargePH.sum()
     CFPV = GPV / CPV / 8.76 if CPV != 0 else 0
     
@@ -119,8 +182,7 @@ def GGTA(solution):
     CostPH = factor['PHP'] * CPHP + factor['PHS'] * CPHS + factor['PHES-VOM'] * DischargePH * pow(10, -6) * resolution / years # A$b p.a.
     CostIndia = factor['India'] * GIndia # A$b p.a.
        
-    # ['SPKP', 'KPLP', 'LPGP', 'GPBP', 'BPMP', 'EPMP', 'TISP', 'GILP', 'MIMP', 'KIEP']
-    CostT = np.array([factor['SPKP'], factor['KPLP'], factor['LPGP'], factor['GPBP'], factor['BPMP'], factor['EPMP'], factor['TISP'], factor['GILP'], factor['MIMP'], factor['KIEP']])
+    CostT = np.array([factor[line] for line in data.Linel])
     CostAC, CAC = [],[]
 
     for i in range(0,len(CostT)):
@@ -178,7 +240,7 @@ def GGTA(solution):
     header = 'Boundary,Annual demand (TWh),Annual Energy Losses (TWh),' \
              'PV Capacity (GW),PV Avg Annual Gen (TWh),Hydro Capacity (GW),Hydro Avg Annual Gen (TWh),Inter Capacity (GW),India Avg Annual Imports (TWh),' \
              'PHES-PowerCap (GW),PHES-EnergyCap (GWh),' \
-             'SPKP, KPLP, LPGP, GPBP, BPMP, EPMP, TISP, GILP, MIMP, KIEP,' \
+             + ', '.join(data.Linel) + ',' \
              'LCOE,LCOG,LCOB,LCOG_PV,LCOG_Hydro,LCOG_IndiaImports,LCOBS_PHES,LCOBT,LCOBL'
     
     ### ALL IN COSTS
@@ -222,14 +284,17 @@ def GGTA(solution):
 
     return True
 
-def Information(x, flexible):
-    """Dispatch: Statistics.Information(x, Flex)"""
+def Information(x, flexible, data):
+    """Dispatch: Statistics.Information(x, Flex, data)"""
 
     start = dt.datetime.now()
     print("Statistics start at", start)
 
-    S = Solution(x)
-    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=flexible, daily_peaking=daily_peaking, peaking_hours=peaking_hours)
+    node, nodes, resolution = (data.node, data.nodes, data.resolution)
+    baseload, daily_peaking, peaking_hours = (data.baseload, data.daily_peaking, data.peaking_hours)
+
+    S = Solution(x, data)
+    Deficit_energy, Deficit_power, Deficit, DischargePH, DischargePeaking, Spillage = Reliability(S, baseload=baseload, india_imports=flexible, daily_peaking=daily_peaking, peaking_hours=peaking_hours, blocks=data.years)
 
     try:
         assert Deficit.sum() * resolution < 0.1, 'Energy generation and demand are not balanced.'
@@ -238,8 +303,8 @@ def Information(x, flexible):
     
     S.TDC = Transmission(S,domestic_only=True, output=True)
     S.CAC = np.amax(abs(S.TDC), axis=0) * pow(10, -3) # CAC(k), MW to GW
-    # SPKP, KPLP, LPGP, GPBP, BPMP, EPMP, TISP, GILP, MIMP, KIEP
-    S.SPKP, S.KPLP, S.LPGP, S.GPBP, S.BPMP, S.EPMP, S.TISP, S.GILP, S.MIMP, S.KIEP = map(lambda k: S.TDC[:, k], range(S.TDC.shape[1]))
+    for k, line in enumerate(data.Linel):
+        setattr(S, line, S.TDC[:, k]) # S.SPKP, S.KPLP, ...
     if 'Super' not in node:
         S.MPV = S.GPV
         S.MIndia = S.GIndia
@@ -252,19 +317,8 @@ def Information(x, flexible):
     S.MPHS = S.CPHS * np.array(S.CPHP) * pow(10, 3) / sum(S.CPHP) # GW to MW
 
 
-    # SPKP, KPLP, LPGP, GPBP, BPMP, EPMP, TISP, GILP, MIMP, KIEP
-    # 'SP' 'KP' 'LP' 'GP' 'BP' 'MP' 'EP' 'TI' 'GI' 'MI' 'KI'
-    S.Topology = np.array([-1 * (S.TISP + S.SPKP),              # SP
-                 (S.SPKP + S.KPLP),                            # KP
-                 -1 * (S.GILP + S.KPLP + S.LPGP),              # LP
-                 (S.LPGP + S.GPBP),                            # GP
-                 -1 * (S.GPBP + S.BPMP),                       # BP
-                 (S.MIMP + S.BPMP + S.EPMP),                   # MP
-                 -1* (S.EPMP + S.KIEP),                        # EP
-                 S.TISP,                                       # TI
-                 -1 * S.GILP,                                  # GI
-                 -1 * S.MIMP,                                  # MI
-                 S.KIEP])                                      # KI
+    # Net transmission into each node, e.g. SP: -1 * (TISP + SPKP)
+    S.Topology = (S.TDC @ data.Incidence.transpose()).transpose() # Topology(j, t), MW
     LPGM(S)
     GGTA(S)
 
@@ -277,4 +331,4 @@ if __name__ == '__main__':
     suffix="_Super_existing_2_True.csv"
     Optimisation_x = np.genfromtxt('Results/Optimisation_resultx{}'.format(suffix), delimiter=',')
     flexible = np.genfromtxt('Results/Dispatch_IndiaImports{}'.format(suffix), delimiter=',', skip_header=1)
-    Information(Optimisation_x, flexible)
+    Information(Optimisation_x, flexible, Model('existing', 'Super', 2, True))
@@ -0,0 +1,80 @@
+# Synthetic input data in the layout of Data/electricity*.csv, Data/pv.csv and Data/RoR_*.csv, for benchmarks and tests without the private data
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+import numpy as np
+import shutil
+import glob
+import os
+
+from Input import Nodel, PVl, firstyear
+
+population = 30e6 # People served by the domestic nodes
+weights = np.array([0.06, 0.05, 0.10, 0.16, 0.38, 0.13, 0.12, 0., 0., 0., 0.]) # Share of the demand of each node
+
+def Calendar(intervals):
+    """Year, Month, Day, Interval columns of hourly 365-day years from firstyear"""
+
+    hours = np.arange(intervals)
+    days = np.datetime64('{}-01-01'.format(firstyear)) + (hours // 24) % 365 # The calendar of a non-leap year, repeated
+    months = days.astype('datetime64[M]')
+    return np.column_stack([firstyear + hours // 8760, months.astype(np.int64) % 12 + 1, (days - months).astype(np.int64) + 1, hours % 24 + 1])
+
+def Write(fname, columns, values, intervals):
+    """A data file with the four calendar columns, as read by Input.py (skip_header=1, usecols from 4)"""
+
+    header = ','.join(['Year', 'Month', 'Day', 'Interval'] + list(columns))
+    np.savetxt(fname, np.hstack([Calendar(intervals), values]), fmt='%.6g', delimiter=',', header=header, comments='')
+
+def Generate(directory='Synthetic', years=10, percapita=2, seed=1):
+    """Synthetic.Generate('Synthetic', 10, 2): <directory>/Data with the public files of Data/ and synthetic time series of any number of years"""
+
+    rng = np.random.default_rng(seed)
+    intervals = 8760 * years
+    hour, day = (np.arange(intervals) % 24, np.arange(intervals) // 24 % 365)
+
+    os.makedirs(os.path.join(directory, 'Data'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'Results'), exist_ok=True)
+    for fname in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data', '*.csv')):
+        shutil.copy(fname, os.path.join(directory, 'Data'))
+
+    ###### DEMAND ######
+    # Evening peak, winter peak and noise, scaled to the annual per-capita demand
+    daily = 1 + 0.15 * np.sin((hour - 9) / 24 * 2 * np.pi) + 0.25 * np.exp(-0.5 * ((hour - 19) / 1.5) ** 2)
+    seasonal = 1 + 0.15 * np.cos(day / 365 * 2 * np.pi)
+    profile = daily * seasonal * rng.uniform(0.95, 1.05, intervals)
+    MLoad = np.outer(profile / profile.mean() * population * percapita / 8760, weights) # MW
+    Write(os.path.join(directory, 'Data', 'electricity{}.csv'.format(percapita)), Nodel, MLoad, intervals)
+
+    ###### SOLAR PV ######
+    # Normalised output of each site: daylight, season and daily cloud cover
+    daylight = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None)
+    clouds = np.repeat(rng.uniform(0.3, 1., (intervals // 24, len(PVl))), 24, axis=0)
+    TSPV = daylight[:, None] * (0.85 + 0.15 * np.cos((day[:, None] - 80) / 365 * 2 * np.pi)) * clouds
+    Write(os.path.join(directory, 'Data', 'pv.csv'), PVl, np.around(TSPV, 4), intervals)
+
+    ###### RUN-OF-RIVER HYDRO ######
+    # Monsoon flows from June to September, capped by the installed capacity of each scenario
+    flow = 0.35 + 0.65 * np.exp(-0.5 * ((day - 215) / 45) ** 2)
+    for fname in glob.glob(os.path.join(directory, 'Data', 'assets_*.csv')):
+        scenario = os.path.basename(fname)[len('assets_'):-len('.csv')]
+        assets = np.genfromtxt(fname, dtype=None, delimiter=',', encoding=None)[1:, 3:].astype(float)
+        capacity = np.zeros(len(Nodel))
+        capacity[:len(assets)] = assets[:, 0] # MW
+        hydroProfiles = np.outer(flow, capacity) * rng.uniform(0.97, 1.03, (intervals, len(Nodel)))
+        Write(os.path.join(directory, 'Data', 'RoR_{}.csv'.format(scenario)), Nodel, hydroProfiles, intervals)
+
+    return directory
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-o', default='Synthetic', type=str, required=False, help='output directory, run the model from there')
+    parser.add_argument('-y', default=10, type=int, required=False, help='years of hourly data')
+    parser.add_argument('-e', default=2, type=int, required=False, help='per-capita electricity = 2, 5, 9 MWh/year')
+    parser.add_argument('--seed', default=1, type=int, required=False, help='random seed')
+    args = parser.parse_args()
+
+    Generate(args.o, args.y, args.e, args.seed)
+    print('Synthetic data of', args.y, 'years written to', os.path.join(args.o, 'Data'))
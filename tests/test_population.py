@@ -0,0 +1,53 @@
+# Vectorised objective with bounded evaluation and memoisation, on one year of synthetic data
+# Copyright (c) 2019, 2020 Bin Lu, The Australian National University
+# Licensed under the MIT Licence
+# Correspondence: bin.lu@anu.edu.au
+
+import os
+import sys
+from multiprocessing import Value
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Synthetic
+import Optimisation
+import Memo
+import Records
+from Input import ModelData
+
+def test_population_partial_abort_with_memo(tmp_path, monkeypatch):
+    """A batch in which some candidates abort and others do not: objectives as F, the completed ones memoised"""
+
+    Synthetic.Generate(str(tmp_path), years=1)
+    monkeypatch.chdir(tmp_path)
+    data = ModelData('existing', 'Super', 2, False)
+
+    ub = np.array(data.pv_ub + data.phes_ub + data.phes_s_ub + data.inters_ub)
+    X = np.array([ub * s for s in (0.02, 0.3, 0.02, 0.4)]) # Large deficits abort, the others complete
+    X[:, data.phidx + 1:] = 0
+
+    monkeypatch.setattr(Optimisation, 'incumbent', None)
+    exact = np.array([Optimisation.F(x, data) for x in X])
+
+    monkeypatch.setattr(Optimisation, 'incumbent', Value('d', 1000.))
+    monkeypatch.setattr(Optimisation, 'aborted', Value('l', 0))
+    monkeypatch.setattr(Memo, 'cache', Memo.cache.__class__())
+    Memo.Setup(16)
+    try:
+        Func = Optimisation.Population(X, data)
+        assert Optimisation.aborted.value == 2
+
+        completed = exact < 1000.
+        assert completed.tolist() == [False, True, False, True]
+        np.testing.assert_allclose(Func[completed], exact[completed])
+        assert (Func[~completed] > 1000.).all() # Aborted: a penalty above the bound
+
+        for x, f in zip(X[completed], Func[completed]):
+            assert Memo.Lookup(x, data) == f
+        for x in X[~completed]:
+            assert Memo.Lookup(x, data) is None
+    finally:
+        Memo.Setup(0)
+        Records.Flush() # In tmp_path, before the working directory is restored